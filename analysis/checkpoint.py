@@ -0,0 +1,96 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from marketdata import pyramid, store
+from marketdata.resample import bucket_end
+from analysis.technical import technical_indicators
+from analysis.peer import SUPPLIES, peer_warmup_start
+from analysis.warmup import warmup_start
+from analysis.streaming import technical_streams, peer_streams
+
+# Indicator checkpoints
+# The state of a streaming indicator set (analysis.streaming) is saved per
+# symbol, interval and set name to <store>/<symbol>/<interval>/indicators/<name>:
+# an int64 header (format, set signature, start of the requested range,
+# open time of the last bar fed, state length) followed by the float64 state
+# (EMA values, window buffers, OBV/VWAP and other running sums), a few KB per
+# set. A restart loads it and feeds only the bars that closed since, instead
+# of replaying the history. Files are replaced atomically; a checkpoint for
+# another set (other calculators, periods or supply) or another requested
+# range start is ignored, so OBV, VWAP and the whole-range statistics always
+# count from the start_ts asked for.
+FORMAT = 2
+HEADER = 5
+
+def _path(symbol, interval, name):
+    return os.path.join(store.STORE_DIR, symbol, interval, "indicators", name)
+
+# Save `streams`, fed from start_ts, as of the bar opening at last_ts
+def save(streams, symbol, interval, name, start_ts, last_ts):
+    state = streams.state()
+    path = _path(symbol, interval, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.{os.getpid()}.tmp", "wb") as f:
+        f.write(np.array([FORMAT, streams.signature, start_ts, last_ts, len(state)], dtype="<i8").tobytes())
+        f.write(state.astype("<f8").tobytes())
+    os.replace(f"{path}.{os.getpid()}.tmp", path)
+
+# Load the checkpoint of `streams` fed from start_ts; returns the open time of
+# its last bar, or None (streams untouched) if there is no usable checkpoint
+def restore(streams, symbol, interval, name, start_ts):
+    try:
+        raw = np.fromfile(_path(symbol, interval, name), dtype="<i8")
+    except FileNotFoundError:
+        return None
+    if len(raw) < HEADER or raw[0] != FORMAT or raw[1] != streams.signature or raw[2] != start_ts or raw[4] != len(raw) - HEADER:
+        return None
+    streams.load_state(raw[HEADER:].view("<f8"))
+    return int(raw[3])
+
+# Bring `streams` up to date with the closed bars up to end_ts (now if None)
+# From a checkpoint of the same requested range only the newer bars are
+# fetched; otherwise the set is built from fetch_from (warm-up bars, see
+# analysis.warmup) with the requested range starting at start_ts. The new
+# state is saved.
+def resume(streams, symbol, interval, name, start_ts, fetch_from=None, end_ts=None):
+    last_ts = restore(streams, symbol, interval, name, start_ts) if store.enabled() else None
+    if last_ts is None:
+        df = pyramid.fetch(symbol, interval, start_ts if fetch_from is None else fetch_from, end_ts)
+        first = start_ts
+    else:
+        df = pyramid.fetch(symbol, interval, int(bucket_end([last_ts], interval)[0]) + 1, end_ts)
+        first = None
+    df = df[df["close_time"] < int(time.time() * 1000)]  # Bars still open are left for the next run
+    if len(df):
+        streams.replay(df, first)
+        if store.enabled():
+            save(streams, symbol, interval, name, start_ts, int(df["timestamp"].iloc[-1].value // 1_000_000))
+    return streams.values
+
+# Technical indicators for one symbol, resumed from its checkpoint
+def technical(symbol, interval, start_ts, end_ts=None):
+    fetch_from = warmup_start(start_ts, [technical_indicators], interval)
+    return resume(technical_streams(), symbol, interval, "technical", start_ts, fetch_from, end_ts)
+
+# Peer metrics for one symbol, resumed from its checkpoint
+def peer(symbol, interval, start_ts, end_ts=None):
+    fetch_from = peer_warmup_start(start_ts, interval)
+    return resume(peer_streams(SUPPLIES[symbol]), symbol, interval, "peer", start_ts, fetch_from, end_ts)
+
+# Keep the technical indicators of a list of symbols current, e.g.
+#   python -m analysis.checkpoint AAVEUSDT ETHUSDT --interval 1m --start 2025-04-01
+def main():
+    parser = argparse.ArgumentParser(description="Update checkpointed streaming indicators")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--start", default="2024-04-07", help="First requested day (YYYY-MM-DD); a new start rebuilds the checkpoint")
+    args = parser.parse_args()
+    start_ts = int(datetime.strptime(args.start, "%Y-%m-%d").timestamp() * 1000)
+    rows = {symbol: technical(symbol, args.interval, start_ts) for symbol in args.symbols}
+    print(pd.DataFrame(rows).to_string())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+from functools import cached_property, wraps
+
+# Shared per-frame features
+# Most metrics re-derive the same series from one frame: daily returns,
+# their annualized volatility, USDT volume (volume * close) and rolling means.
+# A Features wraps the frame and computes each of those once, on first use.
+# It also indexes like the frame (features["close"], len(features)), so every
+# calculate_* takes either a DataFrame or a Features. "running_*" series hold,
+# at each bar, the statistic over all bars up to it.
+class Features:
+    def __init__(self, df):
+        self.df = df
+        self._rolling = {}
+
+    def __getitem__(self, column):
+        return self.df[column]
+
+    def __len__(self):
+        return len(self.df)
+
+    @cached_property
+    def close(self):
+        return self.df["close"]
+
+    # Close-to-close change; NaN on the first bar
+    @cached_property
+    def delta(self):
+        return self.close.diff()
+
+    # Daily returns, first bar dropped
+    @cached_property
+    def returns(self):
+        return self.close.pct_change().dropna()
+
+    # Annualized volatility of daily returns
+    @cached_property
+    def volatility(self):
+        return self.returns.std() * np.sqrt(365)
+
+    @cached_property
+    def running_volatility(self):
+        return self.close.pct_change().expanding().std() * np.sqrt(365)
+
+    # Years from the first bar's open time to each bar's (365-day years)
+    @cached_property
+    def elapsed_years(self):
+        return (self.df["timestamp"] - self.df["timestamp"].iloc[0]) / pd.Timedelta(days=365)
+
+    # Traded value in USDT per bar, as volume * close
+    @cached_property
+    def usd_volume(self):
+        return self.df["volume"] * self.close
+
+    @cached_property
+    def avg_usd_volume(self):
+        return self.usd_volume.mean()
+
+    @cached_property
+    def running_usd_volume(self):
+        return self.usd_volume.expanding().mean()
+
+    # Rolling mean of a column, or of "usd_volume"
+    def rolling_mean(self, column, window):
+        key = (column, window)
+        if key not in self._rolling:
+            values = self.usd_volume if column == "usd_volume" else self.df[column]
+            self._rolling[key] = values.rolling(window=window).mean()
+        return self._rolling[key]
+
+# Wrap a frame in Features (a Features is returned as is)
+def features(df):
+    return df if isinstance(df, Features) else Features(df)
+
+# Metrics written as a full series aligned with the frame's bars
+# fn(df, series=True) returns that series (NaN where a bar has too little
+# history); fn(df) returns its last value. Metrics with several outputs
+# return a DataFrame, and a {column: last value} dict as the scalar.
+def series_metric(fn):
+    @wraps(fn)
+    def metric(df, *args, series=False, **kwargs):
+        values = fn(features(df), *args, **kwargs)
+        if series:
+            return values
+        return values.iloc[-1].to_dict() if isinstance(values, pd.DataFrame) else values.iloc[-1]
+    return metric
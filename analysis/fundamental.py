@@ -1,177 +1,161 @@
-import requests
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import time
 import matplotlib.pyplot as plt
+from marketdata import client, venues
+from analysis.features import series_metric
+from analysis.warmup import lookback, evaluate, latest, trim, warmup_start
 
-# Binance API setup
-BINANCE_API_URL = "https://api.binance.com/api/v3"
+# Analysis setup
 AAVE_SYMBOL = "AAVEUSDT"
-DAYS = 365
-START_DATE = int((datetime(2024, 4, 7)).timestamp() * 1000)
-END_DATE = int((datetime(2025, 4, 7)).timestamp() * 1000)
 
 # Helper function for Binance API
-def fetch_binance_data(endpoint, params={}):
-    url = f"{BINANCE_API_URL}/{endpoint}"
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        raise Exception(f"API request failed: {response.status_code}")
+def fetch_binance_data(endpoint, params=None):
+    return client.get(endpoint, params)
 
-# Fetch historical data
-def fetch_historical_data(symbol):
-    params = {
-        "symbol": symbol,
-        "interval": "1d",
-        "startTime": START_DATE,
-        "endTime": END_DATE,
-        "limit": 1000
-    }
-    klines = fetch_binance_data("klines", params)
-    df = pd.DataFrame(klines, columns=[
-        "timestamp", "open", "high", "low", "close", "volume",
-        "close_time", "quote_volume", "trades", "taker_buy_base",
-        "taker_buy_quote", "ignore"
-    ])
-    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-    df["close"] = df["close"].astype(float)
-    df["volume"] = df["volume"].astype(float)
-    return df
+# Fetch historical data (composite bars across MARKETDATA_VENUES, Binance by default)
+def fetch_historical_data(symbol, start_ts, end_ts):
+    return venues.fetch_composite(symbol, "1d", start_ts, end_ts)
 
 # 1. NVT Ratio
 # Theory: EMH; low NVT suggests price reflects activity (Gandal et al., 2018).
-def calculate_nvt_ratio(df):
+@series_metric
+def calculate_nvt_ratio(f):
     circulating_supply = 16000000  # Fixed for AAVE
-    market_caps = df["close"] * circulating_supply
-    volumes = df["volume"] * df["close"]
-    nvt = market_caps / volumes
-    return nvt.mean()
+    market_caps = f.close * circulating_supply
+    nvt = market_caps / f.usd_volume
+    return nvt.expanding().mean()
 
 # 2. Price/Volume Ratio
 # Theory: High ratio tests price efficiency relative to activity.
-def calculate_price_volume_ratio(df):
-    current_price = df["close"].iloc[-1]
-    avg_volume = (df["volume"] * df["close"]).mean()
-    return current_price / avg_volume if avg_volume != 0 else np.inf
+@series_metric
+def calculate_price_volume_ratio(f):
+    return f.close / f.running_usd_volume  # inf while average volume is 0
 
 # 3. Market Cap Growth Rate
 # Theory: High CAGR reflects investor demand, a fundamental driver.
-def calculate_market_cap_growth(df):
+@series_metric
+def calculate_market_cap_growth(f):
     circulating_supply = 16000000
-    start_market_cap = df["close"].iloc[0] * circulating_supply
-    end_market_cap = df["close"].iloc[-1] * circulating_supply
-    years = 1
-    cagr = (end_market_cap / start_market_cap)**(1 / years) - 1 if start_market_cap != 0 else np.inf
-    return cagr
+    start_market_cap = f.close.iloc[0] * circulating_supply
+    end_market_cap = f.close * circulating_supply
+    years = f.elapsed_years  # Time elapsed, so 366 daily bars span one year
+    cagr = (end_market_cap / start_market_cap)**(1 / years) - 1 if start_market_cap != 0 else pd.Series(np.inf, index=f.close.index)
+    return cagr.where(years > 0)  # NaN on the first bar: no time has elapsed
 
 # 4. Volume CAGR
 # Theory: Growth in volume signals market interest, supporting fundamentals.
-def calculate_volume_cagr(df):
-    start_volume = (df["volume"] * df["close"]).iloc[0]
-    end_volume = (df["volume"] * df["close"]).iloc[-1]
-    years = 1
-    cagr = (end_volume / start_volume)**(1 / years) - 1 if start_volume != 0 else np.inf
-    return cagr
+@series_metric
+def calculate_volume_cagr(f):
+    start_volume = f.usd_volume.iloc[0]
+    end_volume = f.usd_volume
+    years = f.elapsed_years  # Time elapsed, so 366 daily bars span one year
+    cagr = (end_volume / start_volume)**(1 / years) - 1 if start_volume != 0 else pd.Series(np.inf, index=end_volume.index)
+    return cagr.where(years > 0)  # NaN on the first bar: no time has elapsed
 
 # 5. Liquidity Ratio
 # Theory: High liquidity indicates market depth, a fundamental strength.
-def calculate_liquidity_ratio(df):
+@series_metric
+def calculate_liquidity_ratio(f):
     circulating_supply = 16000000
-    market_cap = df["close"].iloc[-1] * circulating_supply
-    avg_daily_volume = (df["volume"] * df["close"]).mean()
-    return avg_daily_volume / market_cap if market_cap != 0 else np.inf
+    market_cap = f.close * circulating_supply
+    return f.running_usd_volume / market_cap
 
 # 6. Mayer Multiple
 # Theory: EMH; high multiple (>2.4) suggests speculation (Greater Fool Theory).
-def calculate_mayer_multiple(df):
-    prices = df["close"]
-    ma_200 = prices.rolling(window=200).mean().iloc[-1]
-    current_price = prices.iloc[-1]
-    return current_price / ma_200 if ma_200 != 0 else np.inf
+@lookback(199)
+@series_metric
+def calculate_mayer_multiple(f):
+    ma_200 = f.rolling_mean("close", 200)
+    return f.close / ma_200
 
 # 7. Price Momentum
 # Theory: High momentum reflects demand strength, a fundamental signal.
-def calculate_price_momentum(df):
-    price_change = (df["close"].iloc[-1] - df["close"].iloc[0]) / df["close"].iloc[0]
+@series_metric
+def calculate_price_momentum(f):
+    price_change = (f.close - f.close.iloc[0]) / f.close.iloc[0]
     return price_change
 
 # 8. Volume Momentum
 # Theory: Volume growth indicates activity supporting price fundamentals.
-def calculate_volume_momentum(df):
-    early_volume = (df["volume"] * df["close"]).iloc[:len(df)//2].mean()
-    late_volume = (df["volume"] * df["close"]).iloc[len(df)//2:].mean()
-    return (late_volume - early_volume) / early_volume if early_volume != 0 else np.inf
+# At each bar, the late half of the bars so far against the early half.
+@series_metric
+def calculate_volume_momentum(f):
+    total = f.usd_volume.cumsum().to_numpy()
+    bars = np.arange(1, len(f) + 1)
+    half = bars // 2
+    before = np.where(half > 0, total[np.maximum(half - 1, 0)], 0.0)  # Volume of the early half
+    with np.errstate(divide="ignore", invalid="ignore"):
+        early_volume = before / half
+        late_volume = (total - before) / (bars - half)
+        momentum = np.where(early_volume != 0, (late_volume - early_volume) / early_volume, np.inf)
+    return pd.Series(momentum, index=f.close.index)
 
 # 9. Volatility-Adjusted Market Cap
 # Theory: Asset Pricing; adjusts value for risk (Damodaran, 2012).
-def calculate_volatility_adjusted_market_cap(df):
+@series_metric
+def calculate_volatility_adjusted_market_cap(f):
     circulating_supply = 16000000
-    market_cap = df["close"].iloc[-1] * circulating_supply
-    returns = df["close"].pct_change().dropna()
-    volatility = returns.std() * np.sqrt(365)
-    return market_cap / (1 + volatility) if volatility != 0 else market_cap
+    market_cap = f.close * circulating_supply
+    return market_cap / (1 + f.running_volatility)
 
 # 10. Turnover Ratio
 # Theory: High turnover suggests active use or selling pressure.
-def calculate_turnover_ratio(df):
+@series_metric
+def calculate_turnover_ratio(f):
     circulating_supply = 16000000
-    total_volume = (df["volume"] * df["close"]).sum()
-    return total_volume / circulating_supply if circulating_supply != 0 else np.inf
+    total_volume = f.usd_volume.cumsum()
+    return total_volume / circulating_supply
 
 # 11. Price Stability Ratio
 # Theory: High stability supports intrinsic value as a utility token.
-def calculate_price_stability_ratio(df):
-    returns = df["close"].pct_change().dropna()
-    volatility = returns.std() * np.sqrt(365)
-    avg_price = df["close"].mean()
-    return avg_price / volatility if volatility != 0 else np.inf
+@series_metric
+def calculate_price_stability_ratio(f):
+    avg_price = f.close.expanding().mean()
+    return avg_price / f.running_volatility  # inf while volatility is 0
 
 # 12. Volume-to-Price Ratio
 # Theory: High ratio indicates activity supports price fundamentals.
-def calculate_volume_to_price_ratio(df):
-    avg_volume = (df["volume"] * df["close"]).mean()
-    current_price = df["close"].iloc[-1]
-    return avg_volume / current_price if current_price != 0 else np.inf
+@series_metric
+def calculate_volume_to_price_ratio(f):
+    return f.running_usd_volume / f.close
 
 # 13. Discounted Expected Utility Value (DEUV)
 # Theory: Asset Pricing; discounts future activity for intrinsic value.
-def calculate_deuv(df, discount_rate=0.12, growth_rate=0.08, years=5):
+@series_metric
+def calculate_deuv(f, discount_rate=0.12, growth_rate=0.08, years=5):
     circulating_supply = 16000000
-    market_cap = df["close"].iloc[-1] * circulating_supply
-    current_volume = (df["volume"] * df["close"]).mean()
-    future_volumes = [current_volume * (1 + growth_rate)**t for t in range(1, years + 1)]
-    discounted_volume = sum([vol / (1 + discount_rate)**t for t, vol in enumerate(future_volumes, 1)])
-    deuv = market_cap / discounted_volume if discounted_volume != 0 else np.inf
+    market_cap = f.close * circulating_supply
+    current_volume = f.running_usd_volume
+    discounted_volume = sum(current_volume * (1 + growth_rate)**t / (1 + discount_rate)**t for t in range(1, years + 1))
+    deuv = market_cap / discounted_volume  # inf while volume is 0
     return deuv
 
 # 14. Price to Volatility Cost
 # Theory: High ratio suggests price exceeds risk cost, a fundamental metric.
-def calculate_price_to_volatility_cost(df):
-    current_price = df["close"].iloc[-1]
-    returns = df["close"].pct_change().dropna()
-    volatility = returns.std() * np.sqrt(365)
-    volatility_cost = current_price * volatility
-    return current_price / volatility_cost if volatility_cost != 0 else np.inf
+@series_metric
+def calculate_price_to_volatility_cost(f):
+    volatility_cost = f.close * f.running_volatility
+    return f.close / volatility_cost
 
 # 15. Regulatory Discount
 # Theory: External risk impacts fundamental value (per feedback).
-def calculate_regulatory_discount(df):
-    current_price = df["close"].iloc[-1]
+@series_metric
+def calculate_regulatory_discount(f):
     haircut = 0.20
-    return current_price * (1 - haircut)
+    return f.close * (1 - haircut)
 
 # Plotting function
-def plot_metrics(df, metrics):
+# `history` holds the metric series from evaluate(..., series=True)
+def plot_metrics(df, history):
     fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(12, 10), sharex=True)
     
     # Top: Price and Mayer Multiple
     ax1.plot(df["timestamp"], df["close"], label="Price", color="blue")
-    ma_200 = df["close"].rolling(window=200).mean()
+    ma_200 = df["close"] / history["mayer_multiple"]  # Mayer Multiple = price / 200-day MA
     ax1.plot(df["timestamp"], ma_200, label="200-day MA", color="orange")
-    ax1.axhline(metrics["regulatory_discount"], color="red", linestyle="--", label="Regulatory Discount")
+    ax1.axhline(history["regulatory_discount"].iloc[-1], color="red", linestyle="--", label="Regulatory Discount")
     ax1.set_ylabel("Price (USDT)")
     ax1.legend()
     ax1.set_title("Aave Fundamental Metrics")
@@ -206,26 +190,31 @@ def plot_metrics(df, metrics):
 # Main function
 def main():
     try:
-        df = fetch_historical_data(AAVE_SYMBOL)
+        start_ts = int((datetime(2024, 4, 7)).timestamp() * 1000)
+        end_ts = int((datetime(2025, 4, 7)).timestamp() * 1000)
         
-        # Calculate metrics
-        metrics = {
-            "nvt_ratio": calculate_nvt_ratio(df),
-            "price_volume_ratio": calculate_price_volume_ratio(df),
-            "market_cap_growth": calculate_market_cap_growth(df),
-            "volume_cagr": calculate_volume_cagr(df),
-            "liquidity_ratio": calculate_liquidity_ratio(df),
-            "mayer_multiple": calculate_mayer_multiple(df),
-            "price_momentum": calculate_price_momentum(df),
-            "volume_momentum": calculate_volume_momentum(df),
-            "volatility_adjusted_market_cap": calculate_volatility_adjusted_market_cap(df),
-            "turnover_ratio": calculate_turnover_ratio(df),
-            "price_stability_ratio": calculate_price_stability_ratio(df),
-            "volume_to_price_ratio": calculate_volume_to_price_ratio(df),
-            "deuv": calculate_deuv(df),
-            "price_to_volatility_cost": calculate_price_to_volatility_cost(df),
-            "regulatory_discount": calculate_regulatory_discount(df)
+        # Metric series over the requested range, warmed up on bars before start_ts
+        metric_functions = {
+            "nvt_ratio": calculate_nvt_ratio,
+            "price_volume_ratio": calculate_price_volume_ratio,
+            "market_cap_growth": calculate_market_cap_growth,
+            "volume_cagr": calculate_volume_cagr,
+            "liquidity_ratio": calculate_liquidity_ratio,
+            "mayer_multiple": calculate_mayer_multiple,
+            "price_momentum": calculate_price_momentum,
+            "volume_momentum": calculate_volume_momentum,
+            "volatility_adjusted_market_cap": calculate_volatility_adjusted_market_cap,
+            "turnover_ratio": calculate_turnover_ratio,
+            "price_stability_ratio": calculate_price_stability_ratio,
+            "volume_to_price_ratio": calculate_volume_to_price_ratio,
+            "deuv": calculate_deuv,
+            "price_to_volatility_cost": calculate_price_to_volatility_cost,
+            "regulatory_discount": calculate_regulatory_discount
         }
+        df = fetch_historical_data(AAVE_SYMBOL, warmup_start(start_ts, metric_functions.values()), end_ts)
+        history = evaluate(metric_functions, df, start_ts, series=True)
+        metrics = latest(history)
+        df = trim(df, start_ts)
         
         # Prepare CSV data
         csv_data = {
@@ -250,7 +239,7 @@ def main():
         print("Fundamental metrics saved to aave_fundamental_metrics.csv")
         
         # Plot metrics
-        plot_metrics(df, metrics)
+        plot_metrics(df, history)
         print("Plot saved to aave_fundamental_plot.png")
         
         # Print metrics
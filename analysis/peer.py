@@ -1,15 +1,13 @@
-import requests
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import matplotlib.pyplot as plt
+from marketdata import pyramid
+from analysis.features import series_metric
+from analysis.warmup import lookback, ema_lookback, evaluate, warmup_start
 
-# Binance API setup
-BINANCE_API_URL = "https://api.binance.com/api/v3"
+# Analysis setup
 SYMBOLS = ["AAVEUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT", "UNIUSDT", "LINKUSDT"]
-DAYS = 365
-START_DATE = int((datetime(2024, 4, 7)).timestamp() * 1000)
-END_DATE = int((datetime(2025, 4, 7)).timestamp() * 1000)
 
 # Circulating supply (fixed, approximate as of April 2025)
 SUPPLIES = {
@@ -21,104 +19,100 @@ SUPPLIES = {
     "LINKUSDT": 500000000  # Chainlink
 }
 
-# Fetch historical data
-def fetch_binance_data(symbol):
-    params = {
-        "symbol": symbol,
-        "interval": "1d",
-        "startTime": START_DATE,
-        "endTime": END_DATE,
-        "limit": 1000
-    }
-    url = f"{BINANCE_API_URL}/klines"
-    response = requests.get(url, params=params)
-    if response.status_code != 200:
-        raise Exception(f"API failed for {symbol}: {response.status_code}")
-    klines = response.json()
-    df = pd.DataFrame(klines, columns=[
-        "timestamp", "open", "high", "low", "close", "volume",
-        "close_time", "quote_volume", "trades", "taker_buy_base",
-        "taker_buy_quote", "ignore"
-    ])
-    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-    df["close"] = df["close"].astype(float)
-    df["volume"] = df["volume"].astype(float)
-    return df
+# Fetch historical data (from the kline pyramid, see marketdata.pyramid)
+def fetch_binance_data(symbol, start_ts, end_ts):
+    return pyramid.fetch(symbol, "1d", start_ts, end_ts)
+
+# Fetch historical data for all peers concurrently
+def fetch_peer_data(symbols, start_ts, end_ts, max_workers=8):
+    return pyramid.fetch_many(symbols, "1d", start_ts, end_ts, max_workers=max_workers)
 
 # Quantitative Metrics
-def calculate_nvt_ratio(df, supply):
-    market_caps = df["close"] * supply
-    volumes = df["volume"] * df["close"]
-    return (market_caps / volumes).mean()
+@series_metric
+def calculate_nvt_ratio(f, supply):
+    market_caps = f.close * supply
+    return (market_caps / f.usd_volume).expanding().mean()
 
-def calculate_sharpe_ratio(df):
-    returns = df["close"].pct_change().dropna()
+@series_metric
+def calculate_sharpe_ratio(f):
+    returns = f.close.pct_change()
     staking_apy = 0.05 / 365  # 5% annualized
     total_returns = returns + staking_apy
     risk_free_rate = 0.025 / 365
     excess_returns = total_returns - risk_free_rate
-    return excess_returns.mean() / excess_returns.std() * np.sqrt(365) if excess_returns.std() != 0 else np.inf
+    spread = excess_returns.expanding().std()
+    return (excess_returns.expanding().mean() / spread * np.sqrt(365)).where(spread != 0, np.inf)
 
 # Fundamental Metrics
-def calculate_price_volume_ratio(df):
-    current_price = df["close"].iloc[-1]
-    avg_volume = (df["volume"] * df["close"]).mean()
-    return current_price / avg_volume if avg_volume != 0 else np.inf
+@series_metric
+def calculate_price_volume_ratio(f):
+    return f.close / f.running_usd_volume  # inf while average volume is 0
 
-def calculate_mayer_multiple(df):
-    ma_200 = df["close"].rolling(window=200).mean().iloc[-1]
-    current_price = df["close"].iloc[-1]
-    return current_price / ma_200 if ma_200 != 0 else np.inf
+@lookback(199)
+@series_metric
+def calculate_mayer_multiple(f):
+    ma_200 = f.rolling_mean("close", 200)
+    return f.close / ma_200
 
 # Qualitative Proxies
 def calculate_speculative_signal(nvt, mayer):
     return 1 if nvt > 50 or mayer > 2.4 else 0
 
-def calculate_price_stability_ratio(df):
-    returns = df["close"].pct_change().dropna()
-    volatility = returns.std() * np.sqrt(365)
-    avg_price = df["close"].mean()
-    return avg_price / volatility if volatility != 0 else np.inf
+@series_metric
+def calculate_price_stability_ratio(f):
+    avg_price = f.close.expanding().mean()
+    return avg_price / f.running_volatility  # inf while volatility is 0
 
 # Technical Metrics
-def calculate_rsi(df, period=14):
-    delta = df["close"].diff()
+@lookback(14)
+@series_metric
+def calculate_rsi(f, period=14):
+    delta = f.delta
     gain = delta.where(delta > 0, 0).rolling(window=period).mean()
     loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
     rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi.iloc[-1] if not rsi.isna().all() else np.nan
+    return 100 - (100 / (1 + rs))
 
-def calculate_macd(df):
-    ema_12 = df["close"].ewm(span=12, adjust=False).mean()
-    ema_26 = df["close"].ewm(span=26, adjust=False).mean()
+@lookback(ema_lookback(26) + ema_lookback(9))
+@series_metric
+def calculate_macd(f):
+    ema_12 = f.close.ewm(span=12, adjust=False).mean()
+    ema_26 = f.close.ewm(span=26, adjust=False).mean()
     macd = ema_12 - ema_26
     signal = macd.ewm(span=9, adjust=False).mean()
-    return macd.iloc[-1] - signal.iloc[-1]
+    return macd - signal
+
+# Peer comparison metrics for one symbol
+# `df` may start with warm-up bars before start_ts (see peer_warmup_start).
+def peer_metrics(df, supply, start_ts):
+    metrics = evaluate({
+        "NVT Ratio": lambda bars: calculate_nvt_ratio(bars, supply),
+        "Sharpe Ratio": calculate_sharpe_ratio,
+        "Price/Volume Ratio": calculate_price_volume_ratio,
+        "Mayer Multiple": calculate_mayer_multiple,
+        "Price Stability Ratio": calculate_price_stability_ratio,
+        "RSI": calculate_rsi,
+        "MACD Histogram": calculate_macd
+    }, df, start_ts)
+    signal = calculate_speculative_signal(metrics["NVT Ratio"], metrics["Mayer Multiple"])
+    names = list(metrics)
+    names.insert(names.index("Mayer Multiple") + 1, "Speculative Signal")
+    return {name: signal if name == "Speculative Signal" else metrics[name] for name in names}
+
+# Warm-up start for fetches feeding peer_metrics
+def peer_warmup_start(start_ts, interval="1d"):
+    return warmup_start(start_ts, [calculate_mayer_multiple, calculate_rsi, calculate_macd], interval)
 
 # Main function
 def main():
     try:
         # Fetch data for all tokens
-        data = {symbol: fetch_binance_data(symbol) for symbol in SYMBOLS}
+        start_ts = int((datetime(2024, 4, 7)).timestamp() * 1000)
+        end_ts = int((datetime(2025, 4, 7)).timestamp() * 1000)
+        data = fetch_peer_data(SYMBOLS, peer_warmup_start(start_ts), end_ts)
         
         # Compute metrics
-        results = {}
-        for symbol in SYMBOLS:
-            df = data[symbol]
-            supply = SUPPLIES[symbol]
-            nvt = calculate_nvt_ratio(df, supply)
-            mayer = calculate_mayer_multiple(df)
-            results[symbol] = {
-                "NVT Ratio": nvt,
-                "Sharpe Ratio": calculate_sharpe_ratio(df),
-                "Price/Volume Ratio": calculate_price_volume_ratio(df),
-                "Mayer Multiple": mayer,
-                "Speculative Signal": calculate_speculative_signal(nvt, mayer),
-                "Price Stability Ratio": calculate_price_stability_ratio(df),
-                "RSI": calculate_rsi(df),
-                "MACD Histogram": calculate_macd(df)
-            }
+        results = {symbol: peer_metrics(data[symbol], SUPPLIES[symbol], start_ts) for symbol in SYMBOLS}
         
         # Prepare CSV data
         csv_data = {"Metric": list(results["AAVEUSDT"].keys())}
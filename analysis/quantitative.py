@@ -1,221 +1,221 @@
-import requests
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import time
 import matplotlib.pyplot as plt
+from marketdata import client, venues
+from analysis.features import series_metric
+from analysis.warmup import lookback, evaluate, latest, trim, warmup_start
 
-# Binance API setup
-BINANCE_API_URL = "https://api.binance.com/api/v3"
+# Analysis setup
 AAVE_SYMBOL = "AAVEUSDT"
-DAYS = 365
-START_DATE = int((datetime(2024, 4, 7)).timestamp() * 1000)
-END_DATE = int((datetime(2025, 4, 7)).timestamp() * 1000)
 
 # Helper function for Binance API
-def fetch_binance_data(endpoint, params={}):
-    url = f"{BINANCE_API_URL}/{endpoint}"
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        raise Exception(f"API request failed: {response.status_code}")
+def fetch_binance_data(endpoint, params=None):
+    return client.get(endpoint, params)
 
-# Fetch historical data
-def fetch_historical_data(symbol):
-    params = {
-        "symbol": symbol,
-        "interval": "1d",
-        "startTime": START_DATE,
-        "endTime": END_DATE,
-        "limit": 1000
-    }
-    klines = fetch_binance_data("klines", params)
-    df = pd.DataFrame(klines, columns=[
-        "timestamp", "open", "high", "low", "close", "volume",
-        "close_time", "quote_volume", "trades", "taker_buy_base",
-        "taker_buy_quote", "ignore"
-    ])
-    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-    df["close"] = df["close"].astype(float)
-    df["volume"] = df["volume"].astype(float)
-    return df
+# Fetch historical data (composite bars across MARKETDATA_VENUES, Binance by default)
+def fetch_historical_data(symbol, start_ts, end_ts):
+    return venues.fetch_composite(symbol, "1d", start_ts, end_ts)
 
 # 1. NVT Ratio (Market Cap / Transaction Volume)
 # Theory: EMH; low NVT suggests price reflects transaction activity.
-def calculate_nvt_ratio(df):
+@series_metric
+def calculate_nvt_ratio(f):
     circulating_supply = 16000000  # Fixed for AAVE
-    market_caps = df["close"] * circulating_supply
-    volumes = df["volume"] * df["close"]  # Quote volume in USDT
-    nvt = market_caps / volumes
-    return nvt.mean()
+    market_caps = f.close * circulating_supply
+    nvt = market_caps / f.usd_volume  # Quote volume in USDT
+    return nvt.expanding().mean()
 
 # 2. Price/Volume Ratio (Proxy for P/F or P/S)
 # Theory: High ratio indicates low activity relative to price, testing efficiency.
-def calculate_price_volume_ratio(df):
-    current_price = df["close"].iloc[-1]
-    avg_volume = (df["volume"] * df["close"]).mean()
-    return current_price / avg_volume if avg_volume != 0 else np.inf
+@series_metric
+def calculate_price_volume_ratio(f):
+    return f.close / f.running_usd_volume  # inf while average volume is 0
 
 # 3. Sharpe Ratio for Staking Yield
 # Theory: CAPM; high Sharpe indicates attractive risk-adjusted returns.
-def calculate_sharpe_ratio_staking(df):
-    returns = df["close"].pct_change().dropna()
+@series_metric
+def calculate_sharpe_ratio_staking(f):
+    returns = f.close.pct_change()
     staking_apy = 0.06  # Assumed
     daily_staking_yield = staking_apy / 365
     total_returns = returns + daily_staking_yield
     risk_free_rate = 0.025 / 365
     excess_returns = total_returns - risk_free_rate
-    sharpe = excess_returns.mean() / excess_returns.std() * np.sqrt(365) if excess_returns.std() != 0 else np.inf
+    spread = excess_returns.expanding().std()
+    sharpe = (excess_returns.expanding().mean() / spread * np.sqrt(365)).where(spread != 0, np.inf)
     return sharpe
 
 # 4. Current Utility Value (Market Cap / Volume)
 # Theory: High ratio suggests price outpaces activity, testing overvaluation.
-def calculate_cuv(df):
+@series_metric
+def calculate_cuv(f):
     circulating_supply = 16000000
-    market_cap = df["close"].iloc[-1] * circulating_supply
-    avg_volume = (df["volume"] * df["close"]).mean()
-    return market_cap / avg_volume if avg_volume != 0 else np.inf
+    market_cap = f.close * circulating_supply
+    return market_cap / f.running_usd_volume
 
 # 5. Discounted Expected Utility Value (DEUV)
 # Theory: Asset Pricing; discounts future volume growth for intrinsic value.
-def calculate_deuv(df, discount_rate=0.12, growth_rate=0.08, years=5):
+@series_metric
+def calculate_deuv(f, discount_rate=0.12, growth_rate=0.08, years=5):
     circulating_supply = 16000000
-    market_cap = df["close"].iloc[-1] * circulating_supply
-    current_volume = (df["volume"] * df["close"]).mean()
-    future_volumes = [current_volume * (1 + growth_rate)**t for t in range(1, years + 1)]
-    discounted_volume = sum([vol / (1 + discount_rate)**t for t, vol in enumerate(future_volumes, 1)])
-    deuv = market_cap / discounted_volume if discounted_volume != 0 else np.inf
+    market_cap = f.close * circulating_supply
+    current_volume = f.running_usd_volume
+    discounted_volume = sum(current_volume * (1 + growth_rate)**t / (1 + discount_rate)**t for t in range(1, years + 1))
+    deuv = market_cap / discounted_volume  # inf while volume is 0
     return deuv
 
 # 6. CAGR of Volume
 # Theory: High growth signals market interest, supporting price fundamentals.
-def calculate_volume_cagr(df):
-    start_volume = (df["volume"] * df["close"]).iloc[0]
-    end_volume = (df["volume"] * df["close"]).iloc[-1]
-    years = 1
-    cagr = (end_volume / start_volume)**(1 / years) - 1 if start_volume != 0 else np.inf
-    return cagr
+@series_metric
+def calculate_volume_cagr(f):
+    start_volume = f.usd_volume.iloc[0]
+    end_volume = f.usd_volume
+    years = f.elapsed_years  # Time elapsed, so 366 daily bars span one year
+    cagr = (end_volume / start_volume)**(1 / years) - 1 if start_volume != 0 else pd.Series(np.inf, index=end_volume.index)
+    return cagr.where(years > 0)  # NaN on the first bar: no time has elapsed
 
 # 7. Volume Source Composition (Buy vs. Sell Proxy)
 # Theory: Balanced volumes suggest stable market dynamics.
-def calculate_volume_composition(df):
+@series_metric
+def calculate_volume_composition(f):
     # Proxy buy/sell using taker volumes (approximate)
-    buy_volume = df["taker_buy_quote"].astype(float).sum()
-    total_volume = (df["volume"] * df["close"]).sum()
+    buy_volume = f["taker_buy_quote"].cumsum()
+    total_volume = f.usd_volume.cumsum()
     sell_volume = total_volume - buy_volume
-    return {"buy_volume": buy_volume / total_volume, "sell_volume": sell_volume / total_volume} if total_volume != 0 else {"buy_volume": 0, "sell_volume": 0}
+    traded = total_volume != 0
+    return pd.DataFrame({
+        "buy_volume": (buy_volume / total_volume).where(traded, 0),
+        "sell_volume": (sell_volume / total_volume).where(traded, 0)
+    })
 
 # 8. Price Volatility Reduction
 # Theory: Lower volatility signals market confidence, supporting EMH.
-def calculate_volatility_reduction(df):
-    returns = df["close"].pct_change().dropna()
-    early_vol = returns.iloc[:len(returns)//2].std() * np.sqrt(365)
-    late_vol = returns.iloc[len(returns)//2:].std() * np.sqrt(365)
-    reduction = (early_vol - late_vol) / early_vol if early_vol != 0 else 0
-    return max(0, reduction)
+# At each bar, the late half of the returns so far against the early half.
+@series_metric
+def calculate_volatility_reduction(f):
+    returns = f.close.pct_change().to_numpy()[1:]
+    returns = returns - returns.mean()  # Std is shift-invariant; centring keeps the sums below accurate
+    sums = np.concatenate(([0.0], np.cumsum(returns)))
+    squares = np.concatenate(([0.0], np.cumsum(returns ** 2)))
+    count = np.arange(1, len(returns) + 1)
+    half = count // 2
+
+    def std(lo, hi):
+        n = hi - lo
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = (squares[hi] - squares[lo] - (sums[hi] - sums[lo]) ** 2 / n) / (n - 1)
+        return np.where(n > 1, np.sqrt(np.maximum(variance, 0)), np.nan) * np.sqrt(365)
+
+    early_vol, late_vol = std(0, half), std(half, count)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        reduction = np.where(early_vol != 0, (early_vol - late_vol) / early_vol, 0)
+    reduction = np.fmax(0, reduction)  # No history yet counts as no reduction
+    return pd.Series(np.concatenate(([0.0], reduction)), index=f.close.index)
 
 # 9. Price Momentum
 # Theory: High momentum suggests bullish fundamentals or speculation.
-def calculate_price_momentum(df):
-    price_change = (df["close"].iloc[-1] - df["close"].iloc[0]) / df["close"].iloc[0]
+@series_metric
+def calculate_price_momentum(f):
+    price_change = (f.close - f.close.iloc[0]) / f.close.iloc[0]
     return price_change
 
 # 10. Risk-Adjusted Volume Discount
 # Theory: CAPM; adjusts volume for market risk exposure.
-def calculate_risk_adjusted_volume_discount(df, risk_free_rate=0.025):
-    returns = df["close"].pct_change().dropna()
-    volatility = returns.std() * np.sqrt(365)
-    avg_volume = (df["volume"] * df["close"]).mean()
+@series_metric
+def calculate_risk_adjusted_volume_discount(f, risk_free_rate=0.025):
+    avg_volume = f.running_usd_volume
     beta = 1.4  # Assumed
     market_risk_premium = 0.06
     discount_rate = risk_free_rate + beta * market_risk_premium
-    risk_adjusted_volume = avg_volume / (1 + discount_rate * volatility)
-    return risk_adjusted_volume / avg_volume if avg_volume != 0 else 0
+    risk_adjusted_volume = avg_volume / (1 + discount_rate * f.running_volatility)
+    return (risk_adjusted_volume / avg_volume).where(avg_volume != 0, 0)
 
 # 11. Trading Volume
 # Theory: High volume reflects market activity, supporting price.
-def calculate_trading_volume(df):
-    return (df["volume"] * df["close"]).mean()
+@series_metric
+def calculate_trading_volume(f):
+    return f.running_usd_volume
 
 # 12. Volume Volatility
 # Theory: High volatility suggests diverse trader behavior.
-def calculate_volume_volatility(df):
-    volumes = df["volume"] * df["close"]
-    return volumes.std() / volumes.mean() if volumes.mean() != 0 else 0
+@series_metric
+def calculate_volume_volatility(f):
+    mean = f.running_usd_volume
+    return (f.usd_volume.expanding().std() / mean).where(mean != 0, 0)
 
 # 13. Price Stability Ratio
 # Theory: High ratio indicates stability, supporting staking-like behavior.
-def calculate_price_stability_ratio(df):
-    returns = df["close"].pct_change().dropna()
-    volatility = returns.std() * np.sqrt(365)
-    avg_price = df["close"].mean()
-    return avg_price / volatility if volatility != 0 else np.inf
+@series_metric
+def calculate_price_stability_ratio(f):
+    avg_price = f.close.expanding().mean()
+    return avg_price / f.running_volatility  # inf while volatility is 0
 
 # 14. Volume-to-Price Ratio
 # Theory: High ratio suggests activity supports price, testing efficiency.
-def calculate_volume_to_price_ratio(df):
-    avg_volume = (df["volume"] * df["close"]).mean()
-    current_price = df["close"].iloc[-1]
-    return avg_volume / current_price if current_price != 0 else np.inf
+@series_metric
+def calculate_volume_to_price_ratio(f):
+    return f.running_usd_volume / f.close
 
 # 15. Price Correlation to Market
 # Theory: Low correlation suggests unique fundamentals.
-def calculate_price_correlation(df):
+@series_metric
+def calculate_price_correlation(f):
     # Proxy market with AAVE itself (single asset); ideally use BTC/ETH
-    returns = df["close"].pct_change().dropna()
+    returns = f.close.pct_change()
     market_returns = returns  # Self-correlation for demo
-    return np.corrcoef(returns, market_returns)[0, 1]
+    return returns.expanding().corr(market_returns)
 
 # 16. Mayer Multiple
 # Theory: EMH; high multiple (>2.4) suggests Greater Fool pricing.
-def calculate_mayer_multiple(df):
-    prices = df["close"]
-    ma_200 = prices.rolling(window=200).mean().iloc[-1]
-    current_price = prices.iloc[-1]
-    return current_price / ma_200 if ma_200 != 0 else np.inf
+@lookback(199)
+@series_metric
+def calculate_mayer_multiple(f):
+    ma_200 = f.rolling_mean("close", 200)
+    return f.close / ma_200
 
 # 17. Price-Based DCF
 # Theory: EMH; projects price growth as fundamental value.
-def calculate_price_dcf(df, discount_rate=0.15, growth_rate=0.10, years=5):
-    current_price = df["close"].iloc[-1]
-    future_prices = [current_price * (1 + growth_rate)**t for t in range(1, years + 1)]
-    discounted_price = sum([p / (1 + discount_rate)**t for t, p in enumerate(future_prices, 1)])
-    valuation_ratio = discounted_price / current_price if current_price != 0 else np.inf
-    return {"intrinsic_value": discounted_price, "valuation_ratio": valuation_ratio}
+@series_metric
+def calculate_price_dcf(f, discount_rate=0.15, growth_rate=0.10, years=5):
+    current_price = f.close
+    discounted_price = sum(current_price * (1 + growth_rate)**t / (1 + discount_rate)**t for t in range(1, years + 1))
+    valuation_ratio = discounted_price / current_price
+    return pd.DataFrame({"intrinsic_value": discounted_price, "valuation_ratio": valuation_ratio})
 
 # 18. Price to Volatility Cost
 # Theory: CAPM; high ratio suggests price exceeds risk cost.
-def calculate_price_to_volatility_cost(df):
-    current_price = df["close"].iloc[-1]
-    returns = df["close"].pct_change().dropna()
-    volatility = returns.std() * np.sqrt(365)
-    volatility_cost = current_price * volatility  # Opportunity cost
-    return current_price / volatility_cost if volatility_cost != 0 else np.inf
+@series_metric
+def calculate_price_to_volatility_cost(f):
+    volatility_cost = f.close * f.running_volatility  # Opportunity cost
+    return f.close / volatility_cost
 
 # 19. Regulatory Discount
 # Theory: External risk impacts valuation.
-def calculate_regulatory_discount(df):
-    current_price = df["close"].iloc[-1]
+@series_metric
+def calculate_regulatory_discount(f):
     haircut = 0.20
-    return current_price * (1 - haircut)
+    return f.close * (1 - haircut)
 
 # 20. Price/Volume Ratio (Additional for P/S Proxy)
 # Theory: Complements P/F, testing activity efficiency.
-def calculate_price_volume_ratio_alt(df):
-    current_price = df["close"].iloc[-1]
-    recent_volume = (df["volume"] * df["close"]).iloc[-30:].mean()  # Last 30 days
-    return current_price / recent_volume if recent_volume != 0 else np.inf
+@lookback(29)
+@series_metric
+def calculate_price_volume_ratio_alt(f):
+    recent_volume = f.usd_volume.rolling(window=30, min_periods=1).mean()  # Last 30 days
+    return f.close / recent_volume
 
 # Plotting function
-def plot_metrics(df, metrics):
+# `history` holds the metric series from evaluate(..., series=True)
+def plot_metrics(df, history):
     fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(12, 10), sharex=True)
     
     # Top: Price and Mayer Multiple
     ax1.plot(df["timestamp"], df["close"], label="Price", color="blue")
-    ma_200 = df["close"].rolling(window=200).mean()
+    ma_200 = df["close"] / history["mayer_multiple"]  # Mayer Multiple = price / 200-day MA
     ax1.plot(df["timestamp"], ma_200, label="200-day MA", color="orange")
-    ax1.axhline(metrics["regulatory_discount"], color="red", linestyle="--", label="Regulatory Discount")
+    ax1.axhline(history["regulatory_discount"].iloc[-1], color="red", linestyle="--", label="Regulatory Discount")
     ax1.set_ylabel("Price (USDT)")
     ax1.legend()
     ax1.set_title("Aave Price and Mayer Multiple")
@@ -251,31 +251,36 @@ def plot_metrics(df, metrics):
 # Main function
 def main():
     try:
-        df = fetch_historical_data(AAVE_SYMBOL)
+        start_ts = int((datetime(2024, 4, 7)).timestamp() * 1000)
+        end_ts = int((datetime(2025, 4, 7)).timestamp() * 1000)
         
-        # Calculate metrics
-        metrics = {
-            "nvt_ratio": calculate_nvt_ratio(df),
-            "price_volume_ratio": calculate_price_volume_ratio(df),
-            "sharpe_ratio": calculate_sharpe_ratio_staking(df),
-            "cuv": calculate_cuv(df),
-            "deuv": calculate_deuv(df),
-            "volume_cagr": calculate_volume_cagr(df),
-            "volume_composition": calculate_volume_composition(df),
-            "volatility_reduction": calculate_volatility_reduction(df),
-            "price_momentum": calculate_price_momentum(df),
-            "risk_adjusted_volume_discount": calculate_risk_adjusted_volume_discount(df),
-            "trading_volume": calculate_trading_volume(df),
-            "volume_volatility": calculate_volume_volatility(df),
-            "price_stability_ratio": calculate_price_stability_ratio(df),
-            "volume_to_price_ratio": calculate_volume_to_price_ratio(df),
-            "price_correlation": calculate_price_correlation(df),
-            "mayer_multiple": calculate_mayer_multiple(df),
-            "price_dcf": calculate_price_dcf(df),
-            "price_to_volatility_cost": calculate_price_to_volatility_cost(df),
-            "regulatory_discount": calculate_regulatory_discount(df),
-            "price_volume_ratio_alt": calculate_price_volume_ratio_alt(df)
+        # Metric series over the requested range, warmed up on bars before start_ts
+        metric_functions = {
+            "nvt_ratio": calculate_nvt_ratio,
+            "price_volume_ratio": calculate_price_volume_ratio,
+            "sharpe_ratio": calculate_sharpe_ratio_staking,
+            "cuv": calculate_cuv,
+            "deuv": calculate_deuv,
+            "volume_cagr": calculate_volume_cagr,
+            "volume_composition": calculate_volume_composition,
+            "volatility_reduction": calculate_volatility_reduction,
+            "price_momentum": calculate_price_momentum,
+            "risk_adjusted_volume_discount": calculate_risk_adjusted_volume_discount,
+            "trading_volume": calculate_trading_volume,
+            "volume_volatility": calculate_volume_volatility,
+            "price_stability_ratio": calculate_price_stability_ratio,
+            "volume_to_price_ratio": calculate_volume_to_price_ratio,
+            "price_correlation": calculate_price_correlation,
+            "mayer_multiple": calculate_mayer_multiple,
+            "price_dcf": calculate_price_dcf,
+            "price_to_volatility_cost": calculate_price_to_volatility_cost,
+            "regulatory_discount": calculate_regulatory_discount,
+            "price_volume_ratio_alt": calculate_price_volume_ratio_alt
         }
+        df = fetch_historical_data(AAVE_SYMBOL, warmup_start(start_ts, metric_functions.values()), end_ts)
+        history = evaluate(metric_functions, df, start_ts, series=True)
+        metrics = latest(history)
+        df = trim(df, start_ts)
         
         # Prepare CSV data
         csv_data = {
@@ -306,7 +311,7 @@ def main():
         print("Metrics saved to aave_metrics.csv")
         
         # Plot metrics
-        plot_metrics(df, metrics)
+        plot_metrics(df, history)
         print("Plot saved to aave_metrics_plot.png")
         
         # Print metrics
@@ -0,0 +1,551 @@
+import math
+import zlib
+from collections import deque
+import numpy as np
+import pandas as pd
+from analysis.peer import calculate_speculative_signal
+
+# Streaming indicators
+# Each calculator takes one bar at a time (a mapping with "high", "low",
+# "close" and "volume") through update(bar), returns the indicator's value
+# at that bar and updates in constant time: EMAs by their recurrence, rolling
+# means and sums by adding the new bar and dropping the oldest, rolling
+# min/max through monotonic deques, OBV/VWAP and whole-range statistics as
+# running sums. Values follow the calculate_* formulas in analysis.technical
+# and analysis.peer bar for bar (RSI and ATR are rolling means there, not
+# Wilder smoothing, and so are they here).
+# Calculators with warmup = True match the @lookback metrics and may be fed
+# bars before the requested range; the others (OBV, VWAP, whole-range
+# statistics) count from the first bar they are given, like metrics that
+# analysis.warmup.evaluate runs on the requested bars only.
+
+# a / b with numpy semantics: inf for x / 0, NaN for 0 / 0
+def _div(a, b):
+    if b != 0 or math.isnan(b):
+        return a / b
+    return math.nan if a == 0 or math.isnan(a) else math.copysign(math.inf, a)
+
+# EMA with adjust=False, seeded with the first value
+class _Ema:
+    __slots__ = ("alpha", "value")
+
+    def __init__(self, span):
+        self.alpha = 2 / (span + 1)
+        self.value = math.nan
+
+    def push(self, x):
+        self.value = x if math.isnan(self.value) else self.value + self.alpha * (x - self.value)
+        return self.value
+
+# Sum of the last `window` values, compensated (Kahan) against drift
+# on long streams; NaN until the window is full
+class _RollingSum:
+    __slots__ = ("window", "values", "total", "error")
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self.error = 0.0
+
+    def _add(self, x):
+        y = x - self.error
+        t = self.total + y
+        self.error = (t - self.total) - y
+        self.total = t
+
+    def push(self, x):
+        if len(self.values) == self.window:
+            self._add(-self.values[0])
+        self.values.append(x)
+        self._add(x)
+        return self.total if len(self.values) == self.window else math.nan
+
+    def mean(self):
+        return self.total / self.window if len(self.values) == self.window else math.nan
+
+# Mean and sample standard deviation of the last `window` values
+# (sliding Welford update); NaN until the window is full
+class _RollingStats:
+    __slots__ = ("window", "values", "mean", "m2")
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, x):
+        if len(self.values) == self.window:
+            old = self.values[0]
+            self.values.append(x)
+            mean = self.mean + (x - old) / self.window
+            self.m2 = max(self.m2 + (x - old) * (x - mean + old - self.mean), 0.0)
+            self.mean = mean
+        else:
+            self.values.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+
+    def full(self):
+        return len(self.values) == self.window
+
+    def std(self):
+        return math.sqrt(self.m2 / (self.window - 1)) if self.full() else math.nan
+
+# Rolling max (or min, with sign=-1) of the last `window` values
+# Two parallel deques hold the bar numbers and values of the candidates,
+# with values decreasing from the front, so the front is the extreme and
+# each value enters and leaves once.
+class _RollingExtreme:
+    __slots__ = ("window", "sign", "bars", "values", "seen")
+
+    def __init__(self, window, sign=1):
+        self.window = window
+        self.sign = sign
+        self.bars = deque()
+        self.values = deque()
+        self.seen = 0
+
+    def push(self, x):
+        key = self.sign * x
+        while self.values and self.sign * self.values[-1] <= key:
+            self.bars.pop()
+            self.values.pop()
+        self.bars.append(self.seen)
+        self.values.append(x)
+        self.seen += 1
+        if self.bars[0] <= self.seen - 1 - self.window:
+            self.bars.popleft()
+            self.values.popleft()
+        return self.values[0] if self.seen >= self.window else math.nan
+
+# Value `bars` bars back; NaN until there is one
+class _Lag:
+    __slots__ = ("values",)
+
+    def __init__(self, bars):
+        self.values = deque(maxlen=bars + 1)
+
+    def push(self, x):
+        self.values.append(x)
+        return self.values[0] if len(self.values) == self.values.maxlen else math.nan
+
+# Mean and sample standard deviation of all values so far (NaN skipped)
+class _Expanding:
+    __slots__ = ("count", "total", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, x):
+        if not math.isnan(x):
+            self.count += 1
+            self.total += x
+            delta = x - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (x - self.mean)
+
+    def average(self):
+        return self.total / self.count if self.count else math.nan
+
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan
+
+# Close-to-close change split into gain and loss (both 0 on the first bar)
+class _Change:
+    __slots__ = ("close",)
+
+    def __init__(self):
+        self.close = math.nan
+
+    def push(self, close):
+        delta = close - self.close
+        self.close = close
+        return (delta, 0.0) if delta > 0 else (0.0, -delta) if delta < 0 else (0.0, 0.0)
+
+# Technical indicators (analysis.technical)
+
+class Sma:
+    __slots__ = ("closes",)
+    warmup = True
+
+    def __init__(self, period=50):
+        self.closes = _RollingSum(period)
+
+    def update(self, bar):
+        self.closes.push(bar["close"])
+        return self.closes.mean()
+
+class Ema:
+    __slots__ = ("ema",)
+    warmup = True
+
+    def __init__(self, span=20):
+        self.ema = _Ema(span)
+
+    def update(self, bar):
+        return self.ema.push(bar["close"])
+
+class Rsi:
+    __slots__ = ("change", "gains", "losses")
+    warmup = True
+
+    def __init__(self, period=14):
+        self.change = _Change()
+        self.gains = _RollingSum(period)
+        self.losses = _RollingSum(period)
+
+    def update(self, bar):
+        gain, loss = self.change.push(bar["close"])
+        self.gains.push(gain)
+        self.losses.push(loss)
+        rs = _div(self.gains.mean(), self.losses.mean())
+        return 100 - _div(100, 1 + rs)
+
+# MACD histogram
+class Macd:
+    __slots__ = ("fast", "slow", "signal")
+    warmup = True
+
+    def __init__(self):
+        self.fast = _Ema(12)
+        self.slow = _Ema(26)
+        self.signal = _Ema(9)
+
+    def update(self, bar):
+        macd = self.fast.push(bar["close"]) - self.slow.push(bar["close"])
+        return macd - self.signal.push(macd)
+
+class BollingerWidth:
+    __slots__ = ("closes",)
+    warmup = True
+
+    def __init__(self, period=20):
+        self.closes = _RollingStats(period)
+
+    def update(self, bar):
+        self.closes.push(bar["close"])
+        if not self.closes.full():
+            return math.nan
+        sma, std = self.closes.mean, self.closes.std()
+        return _div((sma + 2 * std) - (sma - 2 * std), sma)
+
+class Atr:
+    __slots__ = ("close", "ranges")
+    warmup = True
+
+    def __init__(self, period=14):
+        self.close = math.nan
+        self.ranges = _RollingSum(period)
+
+    def update(self, bar):
+        high, low = bar["high"], bar["low"]
+        true_range = high - low
+        if not math.isnan(self.close):
+            true_range = max(true_range, abs(high - self.close), abs(low - self.close))
+        self.close = bar["close"]
+        self.ranges.push(true_range)
+        return self.ranges.mean()
+
+class Obv:
+    __slots__ = ("close", "total")
+    warmup = False
+
+    def __init__(self):
+        self.close = math.nan
+        self.total = 0.0
+
+    def update(self, bar):
+        close = bar["close"]
+        self.total += bar["volume"] if close > self.close else -bar["volume"]
+        self.close = close
+        return self.total
+
+class Vwap:
+    __slots__ = ("value", "volume")
+    warmup = False
+
+    def __init__(self):
+        self.value = 0.0
+        self.volume = 0.0
+
+    def update(self, bar):
+        self.value += (bar["high"] + bar["low"] + bar["close"]) / 3 * bar["volume"]
+        self.volume += bar["volume"]
+        return _div(self.value, self.volume)
+
+# Against the close period - 1 bars back, as calculate_roc
+class Roc:
+    __slots__ = ("closes",)
+    warmup = True
+
+    def __init__(self, period=14):
+        self.closes = _Lag(period - 1)
+
+    def update(self, bar):
+        close = bar["close"]
+        return (_div(close, self.closes.push(close)) - 1) * 100
+
+class StochasticK:
+    __slots__ = ("lows", "highs")
+    warmup = True
+
+    def __init__(self, period=14):
+        self.lows = _RollingExtreme(period, -1)
+        self.highs = _RollingExtreme(period)
+
+    def update(self, bar):
+        lowest_low, highest_high = self.lows.push(bar["low"]), self.highs.push(bar["high"])
+        return _div(100 * (bar["close"] - lowest_low), highest_high - lowest_low)
+
+class WilliamsR:
+    __slots__ = ("lows", "highs")
+    warmup = True
+
+    def __init__(self, period=14):
+        self.lows = _RollingExtreme(period, -1)
+        self.highs = _RollingExtreme(period)
+
+    def update(self, bar):
+        lowest_low, highest_high = self.lows.push(bar["low"]), self.highs.push(bar["high"])
+        return _div(-100 * (highest_high - bar["close"]), highest_high - lowest_low)
+
+# Against the close period - 1 bars back, as calculate_momentum
+class Momentum:
+    __slots__ = ("closes",)
+    warmup = True
+
+    def __init__(self, period=10):
+        self.closes = _Lag(period - 1)
+
+    def update(self, bar):
+        close = bar["close"]
+        return close - self.closes.push(close)
+
+class VolumeOscillator:
+    __slots__ = ("short", "long")
+    warmup = True
+
+    def __init__(self):
+        self.short = _RollingSum(5)
+        self.long = _RollingSum(20)
+
+    def update(self, bar):
+        self.short.push(bar["volume"])
+        self.long.push(bar["volume"])
+        long_ma = self.long.mean()
+        return _div(self.short.mean() - long_ma, long_ma) * 100
+
+class Cmo:
+    __slots__ = ("change", "gains", "losses")
+    warmup = True
+
+    def __init__(self, period=14):
+        self.change = _Change()
+        self.gains = _RollingSum(period)
+        self.losses = _RollingSum(period)
+
+    def update(self, bar):
+        gain, loss = self.change.push(bar["close"])
+        up_sum, down_sum = self.gains.push(gain), self.losses.push(loss)
+        return _div(100 * (up_sum - down_sum), up_sum + down_sum)
+
+# 1 = breakout, -1 = breakdown, 0 = within (the window includes the bar)
+class ChannelBreakout:
+    __slots__ = ("lows", "highs")
+    warmup = True
+
+    def __init__(self, period=20):
+        self.lows = _RollingExtreme(period, -1)
+        self.highs = _RollingExtreme(period)
+
+    def update(self, bar):
+        low_20, high_20 = self.lows.push(bar["low"]), self.highs.push(bar["high"])
+        close = bar["close"]
+        return 1 if close > high_20 else -1 if close < low_20 else 0
+
+# Peer metrics (analysis.peer)
+
+class NvtRatio:
+    __slots__ = ("supply", "ratios")
+    warmup = False
+
+    def __init__(self, supply):
+        self.supply = supply
+        self.ratios = _Expanding()
+
+    def update(self, bar):
+        self.ratios.push(_div(bar["close"] * self.supply, bar["volume"] * bar["close"]))
+        return self.ratios.average()
+
+class SharpeRatio:
+    __slots__ = ("close", "returns")
+    warmup = False
+
+    def __init__(self):
+        self.close = math.nan
+        self.returns = _Expanding()
+
+    def update(self, bar):
+        close = bar["close"]
+        staking_apy = 0.05 / 365  # 5% annualized
+        risk_free_rate = 0.025 / 365
+        self.returns.push(_div(close, self.close) - 1 + staking_apy - risk_free_rate)
+        self.close = close
+        spread = self.returns.std()
+        return math.inf if spread == 0 else self.returns.average() / spread * math.sqrt(365)
+
+class PriceVolumeRatio:
+    __slots__ = ("usd_volume",)
+    warmup = False
+
+    def __init__(self):
+        self.usd_volume = _Expanding()
+
+    def update(self, bar):
+        self.usd_volume.push(bar["volume"] * bar["close"])
+        return _div(bar["close"], self.usd_volume.average())
+
+class MayerMultiple:
+    __slots__ = ("closes",)
+    warmup = True
+
+    def __init__(self):
+        self.closes = _RollingSum(200)
+
+    def update(self, bar):
+        self.closes.push(bar["close"])
+        return _div(bar["close"], self.closes.mean())
+
+class PriceStabilityRatio:
+    __slots__ = ("close", "closes", "returns")
+    warmup = False
+
+    def __init__(self):
+        self.close = math.nan
+        self.closes = _Expanding()
+        self.returns = _Expanding()
+
+    def update(self, bar):
+        close = bar["close"]
+        self.closes.push(close)
+        self.returns.push(_div(close, self.close) - 1)
+        self.close = close
+        return _div(self.closes.average(), self.returns.std() * math.sqrt(365))
+
+# Flat state of a calculator: its slots in order, nested objects inline and
+# deques as their length followed by their items
+def _flatten(obj, out):
+    for name in obj.__slots__:
+        value = getattr(obj, name)
+        if isinstance(value, deque):
+            out.append(len(value))
+            out.extend(value)
+        elif hasattr(value, "__slots__"):
+            _flatten(value, out)
+        else:
+            out.append(value)
+    return out
+
+def _unflatten(obj, values):
+    for name in obj.__slots__:
+        value = getattr(obj, name)
+        if isinstance(value, deque):
+            setattr(obj, name, deque([next(values) for _ in range(int(next(values)))], maxlen=value.maxlen))
+        elif hasattr(value, "__slots__"):
+            _unflatten(value, values)
+        else:
+            setattr(obj, name, type(value)(next(values)))
+
+# Named calculators updated together
+# `signature` is a CRC of the names, calculator types and initial state
+# (which holds every window, span and supply), taken when the set is
+# built, so saved state is only loaded into an identically built set.
+class Indicators:
+    __slots__ = ("calculators", "values", "signature")
+
+    def __init__(self, calculators, outputs=None):
+        self.calculators = calculators
+        self.values = dict.fromkeys(outputs or calculators, math.nan)
+        layout = ",".join(f"{name}:{type(calculator).__name__}" for name, calculator in calculators.items())
+        self.signature = zlib.crc32(self.state().tobytes(), zlib.crc32(layout.encode()))
+
+    def update(self, bar, warmup=False):
+        for name, calculator in self.calculators.items():
+            if calculator.warmup or not warmup:
+                self.values[name] = calculator.update(bar)
+        return self.values
+
+    # Feed a kline frame; bars before start_ts only reach warmup calculators
+    def replay(self, df, start_ts=None):
+        first = pd.Timestamp(start_ts, unit="ms") if start_ts is not None else None
+        for bar in df[["timestamp", "high", "low", "close", "volume"]].to_dict("records"):
+            self.update(bar, warmup=first is not None and bar["timestamp"] < first)
+        return self.values
+
+    # Every calculator's state followed by the current values, as float64
+    def state(self):
+        out = []
+        for calculator in self.calculators.values():
+            _flatten(calculator, out)
+        out.extend(self.values.values())
+        return np.array(out, dtype=np.float64)
+
+    def load_state(self, state):
+        values = iter(state.tolist())
+        for calculator in self.calculators.values():
+            _unflatten(calculator, values)
+        self.values = {name: next(values) for name in self.values}
+        if next(values, None) is not None:
+            raise Exception("Indicator state is longer than its layout")
+
+# Peer calculators, with the speculative signal derived from NVT and Mayer
+class PeerIndicators(Indicators):
+    __slots__ = ()
+
+    def __init__(self, calculators):
+        names = list(calculators)
+        names.insert(names.index("Mayer Multiple") + 1, "Speculative Signal")
+        super().__init__(calculators, names)
+
+    def update(self, bar, warmup=False):
+        super().update(bar, warmup)
+        self.values["Speculative Signal"] = calculate_speculative_signal(self.values["NVT Ratio"], self.values["Mayer Multiple"])
+        return self.values
+
+# Calculators for analysis.technical, keyed like TECHNICAL_METRICS
+def technical_streams():
+    return Indicators({
+        "sma_50": Sma(50),
+        "ema_20": Ema(20),
+        "rsi": Rsi(),
+        "macd": Macd(),
+        "bollinger_width": BollingerWidth(),
+        "atr": Atr(),
+        "obv": Obv(),
+        "vwap": Vwap(),
+        "roc": Roc(),
+        "stochastic_k": StochasticK(),
+        "williams_r": WilliamsR(),
+        "momentum": Momentum(),
+        "volume_oscillator": VolumeOscillator(),
+        "cmo": Cmo(),
+        "channel_breakout": ChannelBreakout()
+    })
+
+# Calculators for analysis.peer, keyed like peer_metrics
+def peer_streams(supply):
+    return PeerIndicators({
+        "NVT Ratio": NvtRatio(supply),
+        "Sharpe Ratio": SharpeRatio(),
+        "Price/Volume Ratio": PriceVolumeRatio(),
+        "Mayer Multiple": MayerMultiple(),
+        "Price Stability Ratio": PriceStabilityRatio(),
+        "RSI": Rsi(),
+        "MACD Histogram": Macd()
+    })
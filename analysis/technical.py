@@ -1,211 +1,255 @@
-import requests
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import time
 import matplotlib.pyplot as plt
+from marketdata import client, pyramid
+from analysis.features import series_metric
+from analysis.warmup import lookback, ema_lookback, evaluate, trim, warmup_start
 
-# Binance API setup
-BINANCE_API_URL = "https://api.binance.com/api/v3"
+# Analysis setup
 AAVE_SYMBOL = "AAVEUSDT"
-DAYS = 365
-START_DATE = int((datetime(2024, 4, 7)).timestamp() * 1000)
-END_DATE = int((datetime(2025, 4, 7)).timestamp() * 1000)
 
 # Helper function for Binance API
-def fetch_binance_data(endpoint, params={}):
-    url = f"{BINANCE_API_URL}/{endpoint}"
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        raise Exception(f"API request failed: {response.status_code}")
+def fetch_binance_data(endpoint, params=None):
+    return client.get(endpoint, params)
 
-# Fetch historical data
-def fetch_historical_data(symbol):
-    params = {
-        "symbol": symbol,
-        "interval": "1d",
-        "startTime": START_DATE,
-        "endTime": END_DATE,
-        "limit": 1000
-    }
-    klines = fetch_binance_data("klines", params)
-    df = pd.DataFrame(klines, columns=[
-        "timestamp", "open", "high", "low", "close", "volume",
-        "close_time", "quote_volume", "trades", "taker_buy_base",
-        "taker_buy_quote", "ignore"
-    ])
-    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-    df["close"] = df["close"].astype(float)
-    df["high"] = df["high"].astype(float)
-    df["low"] = df["low"].astype(float)
-    df["volume"] = df["volume"].astype(float)
-    return df
+# Fetch historical data (from the kline pyramid, see marketdata.pyramid)
+def fetch_historical_data(symbol, start_ts, end_ts):
+    return pyramid.fetch(symbol, "1d", start_ts, end_ts)
 
 # 1. SMA 50-day
 # Theory: Dow Theory; price above SMA signals bullish trend.
-def calculate_sma_50(df):
-    return df["close"].rolling(window=50).mean().iloc[-1]
+@lookback(49)
+@series_metric
+def calculate_sma_50(f):
+    return f.rolling_mean("close", 50)
 
 # 2. EMA 20-day
 # Theory: Faster trend signal than SMA (Murphy, 1999).
-def calculate_ema_20(df):
-    return df["close"].ewm(span=20, adjust=False).mean().iloc[-1]
+@lookback(ema_lookback(20))
+@series_metric
+def calculate_ema_20(f):
+    return f.close.ewm(span=20, adjust=False).mean()
 
 # 3. RSI
 # Theory: Behavioral Finance; overbought (>70) or oversold (<30).
-def calculate_rsi(df, period=14):
-    delta = df["close"].diff()
+@lookback(14)
+@series_metric
+def calculate_rsi(f, period=14):
+    delta = f.delta
     gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
     loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
     rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi.iloc[-1] if not rsi.isna().all() else np.nan
+    return 100 - (100 / (1 + rs))
 
 # 4. MACD
 # Theory: Dow Theory; MACD crossover signals trend changes.
-def calculate_macd(df):
-    ema_12 = df["close"].ewm(span=12, adjust=False).mean()
-    ema_26 = df["close"].ewm(span=26, adjust=False).mean()
+@lookback(ema_lookback(26) + ema_lookback(9))
+@series_metric
+def calculate_macd(f):
+    ema_12 = f.close.ewm(span=12, adjust=False).mean()
+    ema_26 = f.close.ewm(span=26, adjust=False).mean()
     macd = ema_12 - ema_26
     signal = macd.ewm(span=9, adjust=False).mean()
-    return macd.iloc[-1] - signal.iloc[-1]  # MACD Histogram
+    return macd - signal  # MACD Histogram
 
 # 5. Bollinger Bands Width
 # Theory: High width indicates volatility, potential breakout.
-def calculate_bollinger_width(df):
-    sma_20 = df["close"].rolling(window=20).mean()
-    std_20 = df["close"].rolling(window=20).std()
+@lookback(19)
+@series_metric
+def calculate_bollinger_width(f):
+    sma_20 = f.rolling_mean("close", 20)
+    std_20 = f.close.rolling(window=20).std()
     upper = sma_20 + 2 * std_20
     lower = sma_20 - 2 * std_20
-    return (upper.iloc[-1] - lower.iloc[-1]) / sma_20.iloc[-1]
+    return (upper - lower) / sma_20
 
 # 6. ATR
 # Theory: Measures volatility; high ATR signals strong trends.
-def calculate_atr(df, period=14):
+@lookback(14)
+@series_metric
+def calculate_atr(f, period=14):
     tr = pd.DataFrame()
-    tr["hl"] = df["high"] - df["low"]
-    tr["hc"] = (df["high"] - df["close"].shift()).abs()
-    tr["lc"] = (df["low"] - df["close"].shift()).abs()
+    tr["hl"] = f["high"] - f["low"]
+    tr["hc"] = (f["high"] - f.close.shift()).abs()
+    tr["lc"] = (f["low"] - f.close.shift()).abs()
     tr["true_range"] = tr[["hl", "hc", "lc"]].max(axis=1)
-    return tr["true_range"].rolling(window=period).mean().iloc[-1]
+    return tr["true_range"].rolling(window=period).mean()
 
 # 7. OBV
 # Theory: Dow Theory; volume confirms price trends.
-def calculate_obv(df):
-    direction = np.where(df["close"].diff() > 0, 1, -1)
-    obv = (direction * df["volume"]).cumsum()
-    return obv.iloc[-1]
+@series_metric
+def calculate_obv(f):
+    direction = np.where(f.delta > 0, 1, -1)
+    return (direction * f["volume"]).cumsum()
 
 # 8. VWAP
 # Theory: Dynamic support/resistance level.
-def calculate_vwap(df):
-    typical_price = (df["high"] + df["low"] + df["close"]) / 3
-    vwap = (typical_price * df["volume"]).cumsum() / df["volume"].cumsum()
-    return vwap.iloc[-1]
+@series_metric
+def calculate_vwap(f):
+    typical_price = (f["high"] + f["low"] + f.close) / 3
+    return (typical_price * f["volume"]).cumsum() / f["volume"].cumsum()
 
 # 9. Price ROC
 # Theory: High ROC indicates strong momentum.
-def calculate_roc(df, period=14):
-    return ((df["close"].iloc[-1] - df["close"].iloc[-period]) / df["close"].iloc[-period]) * 100
+@lookback(13)
+@series_metric
+def calculate_roc(f, period=14):
+    return f.close.pct_change(period - 1) * 100  # Against the close period - 1 bars back
 
 # 10. Stochastic %K
 # Theory: Behavioral Finance; overbought (>80) or oversold (<20).
-def calculate_stochastic_k(df, period=14):
-    lowest_low = df["low"].rolling(window=period).min()
-    highest_high = df["high"].rolling(window=period).max()
-    k = 100 * (df["close"] - lowest_low) / (highest_high - lowest_low)
-    return k.iloc[-1]
+@lookback(13)
+@series_metric
+def calculate_stochastic_k(f, period=14):
+    lowest_low = f["low"].rolling(window=period).min()
+    highest_high = f["high"].rolling(window=period).max()
+    return 100 * (f.close - lowest_low) / (highest_high - lowest_low)
 
 # 11. Williams %R
 # Theory: Similar to Stochastic, inverted scale.
-def calculate_williams_r(df, period=14):
-    highest_high = df["high"].rolling(window=period).max()
-    lowest_low = df["low"].rolling(window=period).min()
-    r = -100 * (highest_high - df["close"]) / (highest_high - lowest_low)
-    return r.iloc[-1]
+@lookback(13)
+@series_metric
+def calculate_williams_r(f, period=14):
+    highest_high = f["high"].rolling(window=period).max()
+    lowest_low = f["low"].rolling(window=period).min()
+    return -100 * (highest_high - f.close) / (highest_high - lowest_low)
 
 # 12. Momentum Indicator
 # Theory: Raw momentum signal for trend strength.
-def calculate_momentum(df, period=10):
-    return df["close"].iloc[-1] - df["close"].iloc[-period]
+@lookback(9)
+@series_metric
+def calculate_momentum(f, period=10):
+    return f.close.diff(period - 1)  # Against the close period - 1 bars back
 
 # 13. Volume Oscillator
 # Theory: Volume surges support price moves.
-def calculate_volume_oscillator(df):
-    short_ma = df["volume"].rolling(window=5).mean()
-    long_ma = df["volume"].rolling(window=20).mean()
-    return (short_ma.iloc[-1] - long_ma.iloc[-1]) / long_ma.iloc[-1] * 100
+@lookback(19)
+@series_metric
+def calculate_volume_oscillator(f):
+    short_ma = f.rolling_mean("volume", 5)
+    long_ma = f.rolling_mean("volume", 20)
+    return (short_ma - long_ma) / long_ma * 100
 
 # 14. Chande Momentum Oscillator
 # Theory: Pure momentum, less noise than RSI.
-def calculate_cmo(df, period=14):
-    delta = df["close"].diff()
+@lookback(14)
+@series_metric
+def calculate_cmo(f, period=14):
+    delta = f.delta
     up_sum = delta.where(delta > 0, 0).rolling(window=period).sum()
     down_sum = (-delta.where(delta < 0, 0)).rolling(window=period).sum()
-    cmo = 100 * (up_sum - down_sum) / (up_sum + down_sum)
-    return cmo.iloc[-1] if not cmo.isna().all() else np.nan
+    return 100 * (up_sum - down_sum) / (up_sum + down_sum)
 
 # 15. Price Channel Breakout
 # Theory: Breakouts signal trend starts (Murphy, 1999).
-def calculate_channel_breakout(df):
-    high_20 = df["high"].rolling(window=20).max().iloc[-1]
-    low_20 = df["low"].rolling(window=20).min().iloc[-1]
-    current_price = df["close"].iloc[-1]
-    return 1 if current_price > high_20 else -1 if current_price < low_20 else 0  # 1 = breakout, -1 = breakdown, 0 = within
+@lookback(19)
+@series_metric
+def calculate_channel_breakout(f):
+    high_20 = f["high"].rolling(window=20).max()
+    low_20 = f["low"].rolling(window=20).min()
+    current_price = f.close
+    return pd.Series(np.where(current_price > high_20, 1, np.where(current_price < low_20, -1, 0)), index=current_price.index)  # 1 = breakout, -1 = breakdown, 0 = within
+
+# All 15 indicators in one pass (the values main() and the app report)
+# The close diff, gains/losses, true range, 14/20-bar extremes and EMAs are
+# computed once and shared; rolling windows are only evaluated at the last
+# bar. Returns the same values as the functions above, keyed like
+# TECHNICAL_METRICS. OBV and VWAP accumulate from start_ts (the first bar if
+# None), as they would on a frame trimmed by analysis.warmup.evaluate.
+TECHNICAL_METRICS = [
+    "sma_50", "ema_20", "rsi", "macd", "bollinger_width", "atr", "obv", "vwap", "roc",
+    "stochastic_k", "williams_r", "momentum", "volume_oscillator", "cmo", "channel_breakout"
+]
+
+def _last(values, window, reduce):
+    return reduce(values[-window:]) if len(values) >= window else np.nan
+
+def _ema(values, span):
+    return pd.Series(values).ewm(span=span, adjust=False).mean().to_numpy()
+
+@lookback(max(ema_lookback(20), ema_lookback(26) + ema_lookback(9), 49))
+def technical_indicators(df, start_ts=None):
+    close, high, low, volume = (df[name].to_numpy(dtype=np.float64) for name in ("close", "high", "low", "volume"))
+    n = len(close)
+    first = 0 if start_ts is None else int(np.searchsorted(df["timestamp"].to_numpy().astype("datetime64[ms]").view(np.int64), start_ts))
+    if n == 0:
+        return dict.fromkeys(TECHNICAL_METRICS, np.nan)
+
+    # Shared intermediates
+    delta = np.empty(n)
+    delta[0] = np.nan
+    np.subtract(close[1:], close[:-1], out=delta[1:])
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = -np.where(delta < 0, delta, 0.0)
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    low_14, high_14 = _last(low, 14, np.min), _last(high, 14, np.max)
+    low_20, high_20 = _last(low, 20, np.min), _last(high, 20, np.max)
+    ema_12, ema_26 = _ema(close, 12), _ema(close, 26)
+    macd = ema_12 - ema_26
+    sma_20, std_20 = _last(close, 20, np.mean), _last(close, 20, lambda w: np.std(w, ddof=1))
+    volume_20 = _last(volume, 20, np.mean)
+    gain_14, loss_14 = _last(gain, 14, np.sum), _last(loss, 14, np.sum)
+
+    # Cumulative indicators over the requested bars
+    direction = np.where(delta[first:] > 0, 1, -1)
+    if len(direction):
+        direction[0] = -1  # First requested bar has no previous close
+    typical_price = (high[first:] + low[first:] + close[first:]) / 3
+    requested_volume = np.cumsum(volume[first:])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = (gain_14 / 14) / (loss_14 / 14)
+        values = {
+            "sma_50": _last(close, 50, np.mean),
+            "ema_20": _ema(close, 20)[-1],
+            "rsi": 100 - (100 / (1 + rs)),
+            "macd": macd[-1] - _ema(macd, 9)[-1],
+            "bollinger_width": ((sma_20 + 2 * std_20) - (sma_20 - 2 * std_20)) / sma_20,
+            "atr": _last(true_range, 14, np.mean),
+            "obv": np.cumsum(direction * volume[first:])[-1] if len(direction) else np.nan,
+            "vwap": np.cumsum(typical_price * volume[first:])[-1] / requested_volume[-1] if len(direction) else np.nan,
+            "roc": (close[-1] - close[-14]) / close[-14] * 100 if n >= 14 else np.nan,
+            "stochastic_k": 100 * (close[-1] - low_14) / (high_14 - low_14),
+            "williams_r": -100 * (high_14 - close[-1]) / (high_14 - low_14),
+            "momentum": close[-1] - close[-10] if n >= 10 else np.nan,
+            "volume_oscillator": (_last(volume, 5, np.mean) - volume_20) / volume_20 * 100,
+            "cmo": 100 * (gain_14 - loss_14) / (gain_14 + loss_14),
+            "channel_breakout": 1 if close[-1] > high_20 else -1 if close[-1] < low_20 else 0
+        }
+    return values
 
 # Plotting function
-def plot_metrics(df, metrics):
+# `history` holds the metric series from evaluate(..., series=True)
+def plot_metrics(df, history):
     fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(12, 10), sharex=True)
     
     # Top: Price, SMA, EMA, VWAP
     ax1.plot(df["timestamp"], df["close"], label="Price", color="blue")
-    sma_50 = df["close"].rolling(window=50).mean()
-    ema_20 = df["close"].ewm(span=20, adjust=False).mean()
-    typical_price = (df["high"] + df["low"] + df["close"]) / 3
-    vwap = (typical_price * df["volume"]).cumsum() / df["volume"].cumsum()
-    ax1.plot(df["timestamp"], sma_50, label="SMA 50", color="orange")
-    ax1.plot(df["timestamp"], ema_20, label="EMA 20", color="green")
-    ax1.plot(df["timestamp"], vwap, label="VWAP", color="purple")
+    ax1.plot(df["timestamp"], history["sma_50"], label="SMA 50", color="orange")
+    ax1.plot(df["timestamp"], history["ema_20"], label="EMA 20", color="green")
+    ax1.plot(df["timestamp"], history["vwap"], label="VWAP", color="purple")
     ax1.set_ylabel("Price (USDT)")
     ax1.legend()
     ax1.set_title("Aave Technical Analysis")
     
     # Middle: Volume, OBV, Bollinger Width
     ax2.plot(df["timestamp"], df["volume"], label="Volume", color="gray")
-    obv = (np.where(df["close"].diff() > 0, 1, -1) * df["volume"]).cumsum()
     ax2b = ax2.twinx()
-    ax2b.plot(df["timestamp"], obv, label="OBV", color="red")
-    sma_20 = df["close"].rolling(window=20).mean()
-    std_20 = df["close"].rolling(window=20).std()
-    bollinger_width = (sma_20 + 2 * std_20 - (sma_20 - 2 * std_20)) / sma_20
-    ax2b.plot(df["timestamp"], bollinger_width, label="Bollinger Width", color="cyan", linestyle="--")
+    ax2b.plot(df["timestamp"], history["obv"], label="OBV", color="red")
+    ax2b.plot(df["timestamp"], history["bollinger_width"], label="Bollinger Width", color="cyan", linestyle="--")
     ax2.set_ylabel("Volume")
     ax2b.set_ylabel("OBV / Bollinger Width")
     ax2.legend(loc="upper left")
     ax2b.legend(loc="upper right")
     
     # Bottom: RSI, MACD, ATR
-    delta = df["close"].diff()
-    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rsi = 100 - (100 / (1 + gain / loss))
-    ax3.plot(df["timestamp"], rsi, label="RSI", color="blue")
-    ema_12 = df["close"].ewm(span=12, adjust=False).mean()
-    ema_26 = df["close"].ewm(span=26, adjust=False).mean()
-    macd = ema_12 - ema_26
-    signal = macd.ewm(span=9, adjust=False).mean()
-    macd_hist = macd - signal
+    ax3.plot(df["timestamp"], history["rsi"], label="RSI", color="blue")
     ax3b = ax3.twinx()
-    ax3b.plot(df["timestamp"], macd_hist, label="MACD Histogram", color="green")
-    tr = pd.DataFrame()
-    tr["hl"] = df["high"] - df["low"]
-    tr["hc"] = (df["high"] - df["close"].shift()).abs()
-    tr["lc"] = (df["low"] - df["close"].shift()).abs()
-    tr["true_range"] = tr[["hl", "hc", "lc"]].max(axis=1)
-    atr = tr["true_range"].rolling(window=14).mean()
-    ax3b.plot(df["timestamp"], atr, label="ATR", color="orange", linestyle="--")
+    ax3b.plot(df["timestamp"], history["macd"], label="MACD Histogram", color="green")
+    ax3b.plot(df["timestamp"], history["atr"], label="ATR", color="orange", linestyle="--")
     ax3.set_ylabel("RSI")
     ax3b.set_ylabel("MACD / ATR")
     ax3.legend(loc="upper left")
@@ -219,26 +263,32 @@ def plot_metrics(df, metrics):
 # Main function
 def main():
     try:
-        df = fetch_historical_data(AAVE_SYMBOL)
+        start_ts = int((datetime(2024, 4, 7)).timestamp() * 1000)
+        end_ts = int((datetime(2025, 4, 7)).timestamp() * 1000)
         
-        # Calculate metrics
-        metrics = {
-            "sma_50": calculate_sma_50(df),
-            "ema_20": calculate_ema_20(df),
-            "rsi": calculate_rsi(df),
-            "macd": calculate_macd(df),
-            "bollinger_width": calculate_bollinger_width(df),
-            "atr": calculate_atr(df),
-            "obv": calculate_obv(df),
-            "vwap": calculate_vwap(df),
-            "roc": calculate_roc(df),
-            "stochastic_k": calculate_stochastic_k(df),
-            "williams_r": calculate_williams_r(df),
-            "momentum": calculate_momentum(df),
-            "volume_oscillator": calculate_volume_oscillator(df),
-            "cmo": calculate_cmo(df),
-            "channel_breakout": calculate_channel_breakout(df)
+        # Metric series over the requested range for the plots, warmed up on
+        # bars before start_ts; the reported values come from the fused pass
+        metric_functions = {
+            "sma_50": calculate_sma_50,
+            "ema_20": calculate_ema_20,
+            "rsi": calculate_rsi,
+            "macd": calculate_macd,
+            "bollinger_width": calculate_bollinger_width,
+            "atr": calculate_atr,
+            "obv": calculate_obv,
+            "vwap": calculate_vwap,
+            "roc": calculate_roc,
+            "stochastic_k": calculate_stochastic_k,
+            "williams_r": calculate_williams_r,
+            "momentum": calculate_momentum,
+            "volume_oscillator": calculate_volume_oscillator,
+            "cmo": calculate_cmo,
+            "channel_breakout": calculate_channel_breakout
         }
+        df = fetch_historical_data(AAVE_SYMBOL, warmup_start(start_ts, metric_functions.values()), end_ts)
+        history = evaluate(metric_functions, df, start_ts, series=True)
+        metrics = technical_indicators(df, start_ts)
+        df = trim(df, start_ts)
         
         # Prepare CSV data
         csv_data = {
@@ -261,7 +311,7 @@ def main():
         print("Technical metrics saved to aave_technical_metrics.csv")
         
         # Plot metrics
-        plot_metrics(df, metrics)
+        plot_metrics(df, history)
         print("Plot saved to aave_technical_plot.png")
         
         # Print metrics
@@ -0,0 +1,59 @@
+import math
+import numpy as np
+import pandas as pd
+from analysis.features import features
+from marketdata.client import INTERVAL_MS
+
+# Metric warm-up
+# Rolling metrics declare how many bars before the first requested bar they
+# read (@lookback). The fetch is extended back by the largest lookback among
+# the metrics being computed, those metrics see the extended frame, and every
+# other metric (averages over the range, cumulative sums, ...) sees only the
+# requested bars, so short ranges still get valid rolling values.
+
+def lookback(bars):
+    def mark(fn):
+        fn.lookback = bars
+        return fn
+    return mark
+
+# Bars for an adjust=False EMA to forget its seed (weight below `tolerance`)
+def ema_lookback(span, tolerance=0.001):
+    return math.ceil(math.log(tolerance) / math.log(1 - 2 / (span + 1)))
+
+def bars_needed(metrics):
+    return max((getattr(fn, "lookback", 0) for fn in metrics), default=0)
+
+# Start of the fetch that gives `metrics` their warm-up bars before start_ts
+# ("1M" steps back whole calendar months from the month containing start_ts)
+def warmup_start(start_ts, metrics, interval="1d"):
+    if interval == "1M":
+        month = np.datetime64(start_ts, "ms").astype("datetime64[M]") - bars_needed(metrics)
+        return int(month.astype("datetime64[ms]").astype(np.int64))
+    return start_ts - bars_needed(metrics) * INTERVAL_MS[interval]
+
+# Drop the warm-up bars
+def trim(df, start_ts):
+    return df[df["timestamp"] >= pd.Timestamp(start_ts, unit="ms")].reset_index(drop=True)
+
+# Evaluate {name: metric} over a frame fetched from warmup_start()
+# Metrics get Features over the full or the requested frame, so returns,
+# volatility, USDT volume and rolling means are computed once per frame.
+# With series=True each metric returns its full series (see series_metric),
+# cut to the requested bars; latest() turns those back into the scalars.
+def evaluate(metrics, df, start_ts, series=False):
+    full, requested = features(df), features(trim(df, start_ts))
+    if not series:
+        return {name: fn(full if getattr(fn, "lookback", 0) else requested) for name, fn in metrics.items()}
+    warmup = len(full) - len(requested)
+    history = {}
+    for name, fn in metrics.items():
+        if getattr(fn, "lookback", 0):
+            history[name] = fn(full, series=True).iloc[warmup:].reset_index(drop=True)
+        else:
+            history[name] = fn(requested, series=True)
+    return history
+
+# Last value of each series returned by evaluate(..., series=True)
+def latest(history):
+    return {name: values.iloc[-1].to_dict() if isinstance(values, pd.DataFrame) else values.iloc[-1] for name, values in history.items()}
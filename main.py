@@ -1,18 +1,16 @@
 import streamlit as st
 import os
 import pandas as pd
-import requests
 import base64
 from datetime import datetime, timedelta
 import re
 from groq import Groq  # Import Groq SDK
-from analysis.peer import fetch_binance_data, calculate_nvt_ratio, calculate_sharpe_ratio, calculate_price_volume_ratio, calculate_mayer_multiple, calculate_speculative_signal, calculate_price_stability_ratio, calculate_rsi, calculate_macd
+from analysis.peer import fetch_peer_data, peer_metrics, peer_warmup_start, calculate_nvt_ratio, calculate_sharpe_ratio, calculate_price_volume_ratio, calculate_mayer_multiple, calculate_price_stability_ratio
 from analysis.fundamental import calculate_market_cap_growth, calculate_volume_cagr, calculate_liquidity_ratio, calculate_price_momentum, calculate_volume_momentum, calculate_volatility_adjusted_market_cap, calculate_turnover_ratio, calculate_volume_to_price_ratio, calculate_deuv, calculate_price_to_volatility_cost, calculate_regulatory_discount
 from analysis.quantitative import calculate_cuv, calculate_volume_composition, calculate_volatility_reduction, calculate_risk_adjusted_volume_discount, calculate_trading_volume, calculate_volume_volatility, calculate_price_correlation, calculate_price_dcf, calculate_price_volume_ratio_alt
-from analysis.technical import calculate_sma_50, calculate_ema_20, calculate_bollinger_width, calculate_atr, calculate_obv, calculate_vwap, calculate_roc, calculate_stochastic_k, calculate_williams_r, calculate_momentum, calculate_volume_oscillator, calculate_cmo, calculate_channel_breakout
-
-# Binance API setup
-BINANCE_API_URL = "https://api.binance.com/api/v3"
+from analysis.warmup import evaluate, warmup_start
+from marketdata.venues import fetch_composite
+from analysis.technical import fetch_historical_data, technical_indicators
 
 # Coin configurations (approximate circulating supplies as of April 2025)
 COIN_CONFIG = {
@@ -25,6 +23,9 @@ COIN_CONFIG = {
     "LINK": {"symbol": "LINKUSDT", "supply": 500000000}
 }
 
+# Max peer symbols downloaded at once
+PEER_FETCH_WORKERS = 8
+
 # Groq API setup
 GROQ_API_KEY = ""
 GROQ_MODEL = "llama-3.3-70b-versatile"
@@ -80,23 +81,11 @@ def configure_dates(days=None, start_date=None, end_date=None):
 def run_peer_analysis(coin, start_ts, end_ts):
     symbol = COIN_CONFIG[coin]["symbol"]
     peer_symbols = [COIN_CONFIG[c]["symbol"] for c in COIN_CONFIG if c != coin] + [symbol]
-    data = {s: fetch_binance_data(s) for s in peer_symbols}
+    data = fetch_peer_data(peer_symbols, peer_warmup_start(start_ts), end_ts, max_workers=PEER_FETCH_WORKERS)
     results = {}
     for s in peer_symbols:
-        df = data[s]
         supply = COIN_CONFIG[list(COIN_CONFIG.keys())[peer_symbols.index(s)]]["supply"]
-        nvt = calculate_nvt_ratio(df, supply)
-        mayer = calculate_mayer_multiple(df)
-        results[s] = {
-            "NVT Ratio": nvt,
-            "Sharpe Ratio": calculate_sharpe_ratio(df),
-            "Price/Volume Ratio": calculate_price_volume_ratio(df),
-            "Mayer Multiple": mayer,
-            "Speculative Signal": calculate_speculative_signal(nvt, mayer),
-            "Price Stability Ratio": calculate_price_stability_ratio(df),
-            "RSI": calculate_rsi(df),
-            "MACD Histogram": calculate_macd(df)
-        }
+        results[s] = peer_metrics(data[s], supply, start_ts)
     csv_data = {"Metric": list(results[symbol].keys())}
     for s in peer_symbols:
         token = s.replace("USDT", "")
@@ -109,24 +98,25 @@ def run_peer_analysis(coin, start_ts, end_ts):
 # Function to run fundamental analysis
 def run_fundamental_analysis(coin, start_ts, end_ts):
     symbol = COIN_CONFIG[coin]["symbol"]
-    df = fetch_binance_data(symbol)
-    metrics = {
-        "NVT Ratio": calculate_nvt_ratio(df, COIN_CONFIG[coin]["supply"]),
-        "Price/Volume Ratio": calculate_price_volume_ratio(df),
-        "Market Cap Growth Rate": calculate_market_cap_growth(df),
-        "Volume CAGR": calculate_volume_cagr(df),
-        "Liquidity Ratio": calculate_liquidity_ratio(df),
-        "Mayer Multiple": calculate_mayer_multiple(df),
-        "Price Momentum": calculate_price_momentum(df),
-        "Volume Momentum": calculate_volume_momentum(df),
-        "Volatility-Adjusted Market Cap": calculate_volatility_adjusted_market_cap(df),
-        "Turnover Ratio": calculate_turnover_ratio(df),
-        "Price Stability Ratio": calculate_price_stability_ratio(df),
-        "Volume-to-Price Ratio": calculate_volume_to_price_ratio(df),
-        "Discounted Expected Utility Value": calculate_deuv(df),
-        "Price to Volatility Cost": calculate_price_to_volatility_cost(df),
-        "Regulatory Discount": calculate_regulatory_discount(df)
+    metric_functions = {
+        "NVT Ratio": lambda df: calculate_nvt_ratio(df, COIN_CONFIG[coin]["supply"]),
+        "Price/Volume Ratio": calculate_price_volume_ratio,
+        "Market Cap Growth Rate": calculate_market_cap_growth,
+        "Volume CAGR": calculate_volume_cagr,
+        "Liquidity Ratio": calculate_liquidity_ratio,
+        "Mayer Multiple": calculate_mayer_multiple,
+        "Price Momentum": calculate_price_momentum,
+        "Volume Momentum": calculate_volume_momentum,
+        "Volatility-Adjusted Market Cap": calculate_volatility_adjusted_market_cap,
+        "Turnover Ratio": calculate_turnover_ratio,
+        "Price Stability Ratio": calculate_price_stability_ratio,
+        "Volume-to-Price Ratio": calculate_volume_to_price_ratio,
+        "Discounted Expected Utility Value": calculate_deuv,
+        "Price to Volatility Cost": calculate_price_to_volatility_cost,
+        "Regulatory Discount": calculate_regulatory_discount
     }
+    df = fetch_composite(symbol, "1d", warmup_start(start_ts, metric_functions.values()), end_ts)
+    metrics = evaluate(metric_functions, df, start_ts)
     csv_data = {
         "Metric": list(metrics.keys()),
         "Value": list(metrics.values())
@@ -139,31 +129,37 @@ def run_fundamental_analysis(coin, start_ts, end_ts):
 # Function to run quantitative analysis
 def run_quantitative_analysis(coin, start_ts, end_ts):
     symbol = COIN_CONFIG[coin]["symbol"]
-    df = fetch_binance_data(symbol)
-    metrics = {
-        "NVT Ratio": calculate_nvt_ratio(df, COIN_CONFIG[coin]["supply"]),
-        "Price/Volume Ratio": calculate_price_volume_ratio(df),
-        "Sharpe Ratio": calculate_sharpe_ratio(df),
-        "Current Utility Value": calculate_cuv(df),
-        "Discounted Expected Utility Value": calculate_deuv(df),
-        "Volume CAGR": calculate_volume_cagr(df),
-        "Volume Composition (Buy)": calculate_volume_composition(df)["buy_volume"],
-        "Volume Composition (Sell)": calculate_volume_composition(df)["sell_volume"],
-        "Volatility Reduction": calculate_volatility_reduction(df),
-        "Price Momentum": calculate_price_momentum(df),
-        "Risk-Adjusted Volume Discount": calculate_risk_adjusted_volume_discount(df),
-        "Trading Volume": calculate_trading_volume(df),
-        "Volume Volatility": calculate_volume_volatility(df),
-        "Price Stability Ratio": calculate_price_stability_ratio(df),
-        "Volume-to-Price Ratio": calculate_volume_to_price_ratio(df),
-        "Price Correlation": calculate_price_correlation(df),
-        "Mayer Multiple": calculate_mayer_multiple(df),
-        "Price DCF Intrinsic Value": calculate_price_dcf(df)["intrinsic_value"],
-        "Price DCF Valuation Ratio": calculate_price_dcf(df)["valuation_ratio"],
-        "Price to Volatility Cost": calculate_price_to_volatility_cost(df),
-        "Regulatory Discount": calculate_regulatory_discount(df),
-        "Price/Volume Ratio (Alt)": calculate_price_volume_ratio_alt(df)
+    metric_functions = {
+        "NVT Ratio": lambda df: calculate_nvt_ratio(df, COIN_CONFIG[coin]["supply"]),
+        "Price/Volume Ratio": calculate_price_volume_ratio,
+        "Sharpe Ratio": calculate_sharpe_ratio,
+        "Current Utility Value": calculate_cuv,
+        "Discounted Expected Utility Value": calculate_deuv,
+        "Volume CAGR": calculate_volume_cagr,
+        "Volume Composition": calculate_volume_composition,
+        "Volatility Reduction": calculate_volatility_reduction,
+        "Price Momentum": calculate_price_momentum,
+        "Risk-Adjusted Volume Discount": calculate_risk_adjusted_volume_discount,
+        "Trading Volume": calculate_trading_volume,
+        "Volume Volatility": calculate_volume_volatility,
+        "Price Stability Ratio": calculate_price_stability_ratio,
+        "Volume-to-Price Ratio": calculate_volume_to_price_ratio,
+        "Price Correlation": calculate_price_correlation,
+        "Mayer Multiple": calculate_mayer_multiple,
+        "Price DCF": calculate_price_dcf,
+        "Price to Volatility Cost": calculate_price_to_volatility_cost,
+        "Regulatory Discount": calculate_regulatory_discount,
+        "Price/Volume Ratio (Alt)": calculate_price_volume_ratio_alt
     }
+    df = fetch_composite(symbol, "1d", warmup_start(start_ts, metric_functions.values()), end_ts)
+    # Dict-valued metrics are computed once and split into their CSV rows
+    split = {
+        "Volume Composition": {"Volume Composition (Buy)": "buy_volume", "Volume Composition (Sell)": "sell_volume"},
+        "Price DCF": {"Price DCF Intrinsic Value": "intrinsic_value", "Price DCF Valuation Ratio": "valuation_ratio"}
+    }
+    metrics = {}
+    for name, value in evaluate(metric_functions, df, start_ts).items():
+        metrics.update({label: value[key] for label, key in split[name].items()} if name in split else {name: value})
     csv_data = {
         "Metric": list(metrics.keys()),
         "Value": list(metrics.values())
@@ -176,24 +172,26 @@ def run_quantitative_analysis(coin, start_ts, end_ts):
 # Function to run technical analysis
 def run_technical_analysis(coin, start_ts, end_ts):
     symbol = COIN_CONFIG[coin]["symbol"]
-    df = fetch_binance_data(symbol)
-    metrics = {
-        "SMA 50-day": calculate_sma_50(df),
-        "EMA 20-day": calculate_ema_20(df),
-        "RSI": calculate_rsi(df),
-        "MACD Histogram": calculate_macd(df),
-        "Bollinger Bands Width": calculate_bollinger_width(df),
-        "ATR": calculate_atr(df),
-        "OBV": calculate_obv(df),
-        "VWAP": calculate_vwap(df),
-        "Price ROC": calculate_roc(df),
-        "Stochastic %K": calculate_stochastic_k(df),
-        "Williams %R": calculate_williams_r(df),
-        "Momentum": calculate_momentum(df),
-        "Volume Oscillator": calculate_volume_oscillator(df),
-        "Chande Momentum Oscillator": calculate_cmo(df),
-        "Price Channel Breakout": calculate_channel_breakout(df)
+    labels = {
+        "SMA 50-day": "sma_50",
+        "EMA 20-day": "ema_20",
+        "RSI": "rsi",
+        "MACD Histogram": "macd",
+        "Bollinger Bands Width": "bollinger_width",
+        "ATR": "atr",
+        "OBV": "obv",
+        "VWAP": "vwap",
+        "Price ROC": "roc",
+        "Stochastic %K": "stochastic_k",
+        "Williams %R": "williams_r",
+        "Momentum": "momentum",
+        "Volume Oscillator": "volume_oscillator",
+        "Chande Momentum Oscillator": "cmo",
+        "Price Channel Breakout": "channel_breakout"
     }
+    df = fetch_historical_data(symbol, warmup_start(start_ts, [technical_indicators]), end_ts)
+    values = technical_indicators(df, start_ts)
+    metrics = {label: values[name] for label, name in labels.items()}
     csv_data = {
         "Metric": list(metrics.keys()),
         "Value": list(metrics.values())
@@ -262,14 +260,6 @@ if query:
         # Configure date range
         start_ts, end_ts = configure_dates(days, start_date, end_date)
         
-        # Override date parameters in scripts
-        from analysis.peer import START_DATE, END_DATE
-        from analysis.fundamental import START_DATE, END_DATE
-        from analysis.quantitative import START_DATE, END_DATE
-        from analysis.technical import START_DATE, END_DATE
-        START_DATE = start_ts
-        END_DATE = end_ts
-        
         # Run analysis
         analysis_functions = {
             "peer": run_peer_analysis,
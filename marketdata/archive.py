@@ -0,0 +1,135 @@
+import os
+import re
+import zipfile
+import argparse
+import numpy as np
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from marketdata import store
+from marketdata.decode import decode_csv_klines, to_frame
+
+# Binance public kline archive importer
+# Reads the monthly/daily zip (or extracted CSV) files published at
+# data.binance.vision, e.g. BTCUSDT-1m-2024-01.zip, from a local directory
+# and merges them into the local kline store read by the analysis modules.
+ARCHIVE_NAME = re.compile(r"^(?P<symbol>[A-Z0-9]+)-(?P<interval>\d+[smhdwM])-(?P<date>\d{4}-\d{2}(?:-\d{2})?)\.(?:zip|csv)$")
+CHUNK_BYTES = 4 << 20  # Decompressed bytes parsed per step
+IMPORT_WORKERS = os.cpu_count() or 2
+
+# Find archive files under `directory`: {(symbol, interval): [paths in date order]}
+def discover(directory, symbols=None, intervals=None):
+    found = defaultdict(list)
+    for root, _, names in os.walk(directory):
+        for name in names:
+            match = ARCHIVE_NAME.match(name)
+            if not match:
+                continue
+            symbol, interval = match.group("symbol"), match.group("interval")
+            if (symbols and symbol not in symbols) or (intervals and interval not in intervals):
+                continue
+            found[(symbol, interval)].append((match.group("date"), os.path.join(root, name)))
+    return {key: [path for _, path in sorted(files)] for key, files in found.items()}
+
+# Yield decompressed CSV bytes in blocks that end on a line boundary
+def iter_chunks(path):
+    if path.endswith(".zip"):
+        archive = zipfile.ZipFile(path)
+        stream = archive.open(next(n for n in archive.namelist() if n.endswith(".csv")))
+    else:
+        archive, stream = None, open(path, "rb")
+    try:
+        tail = b""
+        while True:
+            block = stream.read(CHUNK_BYTES)
+            if not block:
+                break
+            block = tail + block
+            cut = block.rfind(b"\n") + 1
+            tail = block[cut:]
+            if cut:
+                yield block[:cut]
+        if tail.strip():
+            yield tail
+    finally:
+        stream.close()
+        if archive is not None:
+            archive.close()
+
+# Decode one archive file into typed (floats, ints) arrays
+# Newer spot archives carry a header row and microsecond timestamps;
+# both are normalized to the /klines layout (millisecond open/close times).
+def decode_archive(path):
+    parts = []
+    for i, chunk in enumerate(iter_chunks(path)):
+        if i == 0 and not chunk[:1].isdigit():
+            chunk = chunk[chunk.find(b"\n") + 1:]
+        parts.append(decode_csv_klines(chunk))
+    if not parts:
+        return np.empty((8, 0)), np.empty((3, 0), dtype=np.int64)
+    floats = np.concatenate([p[0] for p in parts], axis=1)
+    ints = np.concatenate([p[1] for p in parts], axis=1)
+    micros = ints[0] > 10 ** 14
+    ints[:2, micros] //= 1000
+    return floats, ints
+
+# Ordered map over an executor keeping at most `window` results in memory
+def bounded_map(pool, fn, items, window):
+    pending = []
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
+
+# Import every archive for one (symbol, interval) into the store
+# Each file replaces the stored bars within its own [first open, last close]
+# span; stored bars outside every file's span (e.g. a month fetched from the
+# API between two imported months) are kept. Files are merged one at a time
+# through store.interleave, so only one file and one stored window are in
+# memory. Each file adds its own range to the coverage index, so a missing
+# month stays a gap for the fetchers to fill.
+def _import_series(pool, symbol, interval, paths, window):
+    covered = store.coverage(symbol, interval)
+    imported = {"rows": 0, "last": None}
+
+    def pieces():
+        for arrays in bounded_map(pool, decode_archive, paths, window):
+            df = to_frame(*arrays)
+            if imported["last"] is not None:
+                df = df[df["timestamp"] > imported["last"]]  # Daily files overlapping a monthly one
+            if df.empty:
+                continue
+            lo, hi = _ms(df["timestamp"].iloc[0]), int(df["close_time"].iloc[-1])
+            imported["rows"] += len(df)
+            imported["last"] = df["timestamp"].iloc[-1]
+            covered.add(lo, hi)
+            yield lo, hi, df.reset_index(drop=True)
+
+    store.write(symbol, interval, store.interleave(symbol, interval, pieces()), covered)  # Filled in as the pieces are consumed
+    return imported["rows"]
+
+def _ms(ts):
+    return int(ts.value // 10 ** 6)
+
+def import_archives(directory, symbols=None, intervals=None, max_workers=IMPORT_WORKERS):
+    series = discover(directory, symbols, intervals)
+    imported = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for (symbol, interval), paths in sorted(series.items()):
+            with store.lock(symbol, interval):
+                imported[(symbol, interval)] = _import_series(pool, symbol, interval, paths, window=2 * max_workers)
+    return imported
+
+def main():
+    parser = argparse.ArgumentParser(description="Import Binance public kline archives into the local store")
+    parser.add_argument("directory", help="Directory containing SYMBOL-INTERVAL-DATE.zip files")
+    parser.add_argument("--symbols", nargs="*", help="Only these symbols")
+    parser.add_argument("--intervals", nargs="*", help="Only these intervals")
+    parser.add_argument("--workers", type=int, default=IMPORT_WORKERS)
+    args = parser.parse_args()
+    for (symbol, interval), rows in import_archives(args.directory, args.symbols, args.intervals, args.workers).items():
+        print(f"{symbol} {interval}: {rows} bars imported")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import time
+import requests
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from marketdata import hosts, ratelimit, singleflight, store
+from marketdata.decode import decode_klines, parse_klines
+
+# Binance API setup (base URLs live in marketdata.hosts)
+TIMEOUT = (3.05, 10)  # (connect, read) seconds
+POOL_SIZE = 16  # Keep-alive connections kept open per host
+KLINE_LIMIT = 1000  # Max bars Binance returns per /klines request
+PAGE_WORKERS = 4  # Page requests kept in flight per paginated fetch
+SYMBOL_WORKERS = 8  # Default cap on symbols fetched concurrently
+RETRIES = 3  # Extra attempts after a 5xx or a failed connection
+RETRY_BACKOFF = 0.3  # Seconds before the first retry, doubling after each
+
+# Bar length per Binance interval ("1M" is calendar-based and walked sequentially)
+INTERVAL_MS = {
+    "1s": 1000, "1m": 60000, "3m": 180000, "5m": 300000, "15m": 900000,
+    "30m": 1800000, "1h": 3600000, "2h": 7200000, "4h": 14400000,
+    "6h": 21600000, "8h": 28800000, "12h": 43200000, "1d": 86400000,
+    "3d": 259200000, "1w": 604800000
+}
+
+# Shared HTTP session
+# One connection pool for the whole process so repeated calls reuse the
+# TCP+TLS connection instead of paying a fresh handshake per request.
+def _make_session():
+    session = requests.Session()
+    # Only failed connects are retried here (nothing reached the server);
+    # 5xx and read errors are retried by _request through the limiter and host pool
+    retry = Retry(
+        total=RETRIES,
+        connect=RETRIES,
+        read=0,
+        status=0,
+        other=0,
+        backoff_factor=RETRY_BACKOFF,
+        allowed_methods=frozenset(["GET"])
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept": "application/json", "Connection": "keep-alive"})
+    return session
+
+SESSION = _make_session()
+
+# Send one GET to a single base URL and record its latency in the host pool
+def _send(url, endpoint, params):
+    started = time.perf_counter()
+    try:
+        response = SESSION.get(f"{url}/{endpoint}", params=params, timeout=TIMEOUT)
+    except requests.RequestException:
+        hosts.POOL.record(url, time.perf_counter() - started, ok=False)
+        raise
+    hosts.POOL.record(url, time.perf_counter() - started, ok=response.status_code < 500)
+    ratelimit.observe(response)
+    return response
+
+_HEDGE_POOL = ThreadPoolExecutor(max_workers=POOL_SIZE * 2, thread_name_prefix="binance-request")
+
+# True once a request has produced a usable answer (anything but an error/5xx)
+def _answered(future):
+    return future.done() and future.exception() is None and future.result().status_code < 500
+
+# One attempt: send to the best host and, if it has not answered within its
+# p95 latency, a duplicate to the next-best host (when the weight budget
+# allows). Returns the first 200, else the last response; raises if every
+# copy failed to connect or read.
+def _attempt(endpoint, params, weight):
+    pool = hosts.POOL
+    primary = pool.pick()
+    futures = [_HEDGE_POOL.submit(_send, primary, endpoint, params)]
+    wait(futures, timeout=pool.hedge_delay(primary))
+    if not _answered(futures[0]):
+        backup = pool.pick(exclude=(primary,))
+        if backup is not None and ratelimit.try_acquire(weight):
+            futures.append(_HEDGE_POOL.submit(_send, backup, endpoint, params))
+    pending, response, error = set(futures), None, None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except requests.RequestException as e:
+                error = e
+                continue
+            if result.status_code == 200:
+                return result
+            response = result
+    if response is None:
+        raise error
+    return response
+
+# Helper function for Binance API
+# Every attempt first takes its weight from the shared rate limiter. A 5xx
+# or a failed read is retried up to RETRIES times with exponential backoff,
+# each retry a separate attempt that is charged and timed per host like the
+# first (so the host pool sees every failure and its own latency).
+def _request(endpoint, params=None):
+    weight = ratelimit.request_weight(endpoint, params)
+    for attempt in range(RETRIES + 1):
+        ratelimit.acquire(weight)
+        try:
+            response = _attempt(endpoint, params, weight)
+        except requests.RequestException:
+            if attempt == RETRIES:
+                raise
+        else:
+            if response.status_code < 500 or attempt == RETRIES:
+                break
+        time.sleep(RETRY_BACKOFF * 2 ** attempt)
+    if response.status_code == 200:
+        return response
+    raise Exception(f"API request failed: {response.status_code}")
+
+def get(endpoint, params=None):
+    return _request(endpoint, params).json()
+
+# Raw response body, for callers that decode it themselves
+def get_raw(endpoint, params=None):
+    return _request(endpoint, params).content
+
+# Fetch a single page of klines as the raw response body
+def _fetch_page(symbol, interval, start_ts=None, end_ts=None):
+    params = {"symbol": symbol, "interval": interval, "limit": KLINE_LIMIT}
+    if start_ts is not None:
+        params["startTime"] = start_ts
+    if end_ts is not None:
+        params["endTime"] = end_ts
+    return get_raw("klines", params)
+
+# Walk startTime forward one page at a time (used when bar length is not fixed)
+def _walk_pages(symbol, interval, start_ts, end_ts):
+    pages = []
+    while end_ts is None or start_ts <= end_ts:
+        page = _fetch_page(symbol, interval, start_ts, end_ts)
+        open_times = decode_klines(page)[1][0]
+        if not len(open_times):
+            break
+        pages.append(page)
+        if len(open_times) < KLINE_LIMIT:
+            break
+        start_ts = int(open_times[-1]) + 1
+    return pages
+
+# Fetch pages concurrently
+# With a fixed bar length every page window is known up front, so all
+# windows are requested through the shared pool instead of one after another.
+_PAGE_POOL = ThreadPoolExecutor(max_workers=PAGE_WORKERS, thread_name_prefix="kline-page")
+
+def _fetch_pages(symbol, interval, start_ts, end_ts):
+    span = INTERVAL_MS[interval] * KLINE_LIMIT
+    windows = [(s, min(s + span - 1, end_ts)) for s in range(start_ts, end_ts + 1, span)]
+    if len(windows) == 1:
+        return [_fetch_page(symbol, interval, start_ts, end_ts)]
+    futures = [_PAGE_POOL.submit(_fetch_page, symbol, interval, s, e) for s, e in windows]
+    return [f.result() for f in futures]
+
+# Download historical klines
+# Ranges longer than KLINE_LIMIT bars are split into pages whose raw bodies
+# are decoded together into one contiguous set of typed arrays.
+def download_klines(symbol, interval="1d", start_ts=None, end_ts=None):
+    try:
+        pages = download_pages(symbol, interval, start_ts, end_ts)
+    except Exception as e:
+        raise Exception(f"API failed for {symbol}: {e}")
+    return parse_klines(pages)
+
+# Raw page bodies covering [start_ts, end_ts], in order
+def download_pages(symbol, interval="1d", start_ts=None, end_ts=None):
+    if start_ts is None:
+        return [_fetch_page(symbol, interval, end_ts=end_ts)]
+    if interval not in INTERVAL_MS:
+        return _walk_pages(symbol, interval, start_ts, end_ts)
+    if end_ts is None:
+        end_ts = int(time.time() * 1000)
+    return _fetch_pages(symbol, interval, start_ts, end_ts)
+
+# Fetch historical klines
+# Concurrent calls for the same (symbol, interval, start, end) are coalesced
+# into one fetch; each caller gets its own shallow copy of the shared frame.
+def fetch_klines(symbol, interval="1d", start_ts=None, end_ts=None):
+    key = (symbol, interval, start_ts, end_ts)
+    df = singleflight.do(key, _fetch_klines, symbol, interval, start_ts, end_ts)
+    return df.copy(deep=False)
+
+# Serve klines from the local store where possible
+# Only the sub-ranges of [start_ts, end_ts] missing from the series' coverage
+# index are downloaded and merged into the store. Bars still open at download
+# time are returned but never persisted.
+def _fetch_klines(symbol, interval, start_ts, end_ts):
+    if start_ts is None or not store.enabled():
+        return download_klines(symbol, interval, start_ts, end_ts)
+    now = int(time.time() * 1000)
+    step = INTERVAL_MS.get(interval, 31 * INTERVAL_MS["1d"])
+    if end_ts is None:
+        end_ts = now
+    closed_until = min(end_ts, now - step)  # Every bar opening by then has closed
+    live = []
+    with store.lock(symbol, interval):
+        covered = store.coverage(symbol, interval)
+        gaps = covered.missing(start_ts, end_ts)
+        if gaps:
+            fetched = []
+            for lo, hi in gaps:
+                df = download_klines(symbol, interval, lo, hi)
+                fetched.append((lo, hi, df[df["close_time"] < now]))
+                live.append(df[df["close_time"] >= now])
+                covered.add(lo, min(hi, closed_until))
+            store.merge(symbol, interval, fetched, covered)
+    df = store.read(symbol, interval, start_ts, end_ts)
+    if df is None:
+        df = parse_klines([])
+    live = [bars for bars in live if len(bars)]
+    return pd.concat([df, *live], ignore_index=True) if live else df
+
+# Fetch klines for several symbols concurrently
+# Returns {symbol: DataFrame} in the order given; at most max_workers
+# symbols are in flight at once. `fetch` is called as fetch(symbol, interval,
+# start_ts, end_ts) for each symbol (e.g. marketdata.pyramid.fetch).
+def fetch_many(symbols, interval="1d", start_ts=None, end_ts=None, max_workers=SYMBOL_WORKERS, fetch=fetch_klines):
+    symbols = list(symbols)
+    workers = max(1, min(max_workers, len(symbols)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kline-symbol") as pool:
+        futures = [pool.submit(fetch, s, interval, start_ts, end_ts) for s in symbols]
+        return {s: f.result() for s, f in zip(symbols, futures)}
@@ -0,0 +1,56 @@
+import bisect
+
+# Coverage index for one stored (symbol, interval) series
+# Records which open-time ranges (ms, inclusive) have been fetched in full,
+# so exchange outages inside a covered range are known to be empty rather
+# than unknown. Ranges are kept disjoint and sorted, with touching ranges
+# merged, in two parallel lists of starts and ends; lookups bisect them.
+class CoverageIndex:
+    def __init__(self, ranges=()):
+        self.starts, self.ends = [], []
+        for lo, hi in ranges:
+            self.add(lo, hi)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def ranges(self):
+        return [[lo, hi] for lo, hi in zip(self.starts, self.ends)]
+
+    # Mark [lo, hi] as held, merging every range it overlaps or touches
+    def add(self, lo, hi):
+        lo, hi = int(lo), int(hi)
+        if hi < lo:
+            return
+        i = bisect.bisect_left(self.ends, lo - 1)
+        j = bisect.bisect_right(self.starts, hi + 1)
+        if i < j:
+            lo, hi = min(lo, self.starts[i]), max(hi, self.ends[j - 1])
+        self.starts[i:j] = [lo]
+        self.ends[i:j] = [hi]
+
+    # Sub-ranges of [lo, hi] not held, in order: O(log n + gaps)
+    def missing(self, lo, hi):
+        gaps = []
+        cursor = lo
+        i = bisect.bisect_left(self.ends, lo)
+        while i < len(self.starts) and self.starts[i] <= hi and cursor <= hi:
+            if self.starts[i] > cursor:
+                gaps.append((cursor, self.starts[i] - 1))
+            cursor = max(cursor, self.ends[i] + 1)
+            i += 1
+        if cursor <= hi:
+            gaps.append((cursor, hi))
+        return gaps
+
+    # Sub-ranges of [lo, hi] that are held, in order
+    def held(self, lo, hi):
+        pieces = []
+        i = bisect.bisect_left(self.ends, lo)
+        while i < len(self.starts) and self.starts[i] <= hi:
+            pieces.append((max(lo, self.starts[i]), min(hi, self.ends[i])))
+            i += 1
+        return pieces
+
+    def covers(self, lo, hi):
+        return not self.missing(lo, hi)
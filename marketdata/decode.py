@@ -0,0 +1,70 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+# Kline row layout as returned by /klines (12 values per bar)
+KLINE_FIELDS = 12
+FLOAT_COLUMNS = {
+    "open": 1, "high": 2, "low": 3, "close": 4, "volume": 5,
+    "quote_volume": 7, "taker_buy_base": 9, "taker_buy_quote": 10
+}
+INT_COLUMNS = {"timestamp": 0, "close_time": 6, "trades": 8}
+KLINE_COLUMNS = [
+    "timestamp", "open", "high", "low", "close", "volume",
+    "close_time", "quote_volume", "trades", "taker_buy_base", "taker_buy_quote"
+]
+
+# JSON punctuation removed so a klines body becomes a flat comma-separated list of numbers
+_PUNCTUATION = b'[]"'
+
+# Decode raw /klines bodies into typed column arrays
+# Accepts one response body or a list of page bodies (stitched in order).
+# Returns (floats, ints): C-contiguous (8, n) float64 and (3, n) int64 arrays
+# whose rows follow FLOAT_COLUMNS / INT_COLUMNS. Numbers are parsed in C by
+# NumPy straight from the bytes, so no Python objects are created per value.
+def decode_klines(raw):
+    pages = [raw] if isinstance(raw, (bytes, bytearray)) else raw
+    return _decode_text(b",".join(body for body in (p.translate(None, _PUNCTUATION).strip() for p in pages) if body), "/klines")
+
+# Decode a block of kline CSV lines (Binance public archive layout, no header)
+def decode_csv_klines(chunk):
+    return _decode_text(chunk.replace(b"\r", b"").strip().replace(b"\n", b","), "kline archive")
+
+# Parse comma-separated numbers into rows of `fields` values
+# NumPy stops at the first value it cannot parse (an error body, a cut-off
+# page), with only a warning on older versions; such a payload, or one that
+# does not split into whole rows, raises ValueError naming `source`.
+def parse_rows(text, fields, source):
+    if not text:
+        return np.empty((0, fields))
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", DeprecationWarning)
+            flat = np.fromstring(text, dtype=np.float64, sep=",")
+    except (ValueError, DeprecationWarning):
+        raise ValueError(f"Malformed {source} payload: unparsable value in {bytes(text[:80])!r}") from None
+    if flat.size % fields:
+        raise ValueError(f"Malformed {source} payload: {flat.size} values, not rows of {fields}")
+    return flat.reshape(-1, fields)
+
+def _decode_text(text, source):
+    rows = parse_rows(text, KLINE_FIELDS, source).T
+    floats = rows[list(FLOAT_COLUMNS.values())]
+    ints = rows[list(INT_COLUMNS.values())].astype(np.int64)
+    return floats, ints
+
+# Wrap decoded arrays in a DataFrame without copying
+# Each column is a view onto the decoded arrays (one block per column).
+def to_frame(floats, ints):
+    columns = {name: floats[i] for i, name in enumerate(FLOAT_COLUMNS)}
+    columns.update({name: ints[i] for i, name in enumerate(INT_COLUMNS)})
+    return frame_from_columns(columns)
+
+# DataFrame over {column name: 1-D array}, with "timestamp" given as int64 ms
+def frame_from_columns(columns):
+    columns = dict(columns, timestamp=columns["timestamp"].view("datetime64[ms]"))
+    return pd.DataFrame({name: columns[name] for name in KLINE_COLUMNS}, copy=False)
+
+# Parse raw klines bodies into a typed DataFrame
+def parse_klines(raw):
+    return to_frame(*decode_klines(raw))
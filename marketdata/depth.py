@@ -0,0 +1,151 @@
+import os
+import time
+import argparse
+import numpy as np
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from marketdata import client, store
+from marketdata.decode import parse_rows
+
+# Order-book depth snapshots
+# Each /api/v3/depth snapshot is reduced to one fixed-width record: the best
+# bid/ask plus the quote notional resting in BIN_WIDTH-wide price bins on
+# each side of the mid, out to BINS bins (2%). Bins beyond the deepest level
+# a truncated side returned are stored as NaN rather than partial sums;
+# liquid pairs need a larger limit (up to 5000) to fill the outer bins.
+# Records are appended to one file per symbol and UTC day under
+# <store>/<symbol>/depth/, ~200 bytes per snapshot, so every USDT pair can
+# be captured every minute in ~100 MB/day.
+DEPTH_LIMIT = 100  # Levels requested per side (weight 5; 500 costs 25)
+BIN_WIDTH = 0.001  # 0.1% of mid per bin
+BINS = 20  # Bins per side: depth out to +/-2%
+COLLECT_WORKERS = 8
+DAY_MS = 86400000
+
+SNAPSHOT_DTYPE = np.dtype([
+    ("time", "<i8"),  # Collection time (ms)
+    ("update_id", "<i8"),  # Binance lastUpdateId
+    ("bid", "<f8"),
+    ("ask", "<f8"),
+    ("bid_reach", "<f4"),  # Distance from mid of the deepest level returned (fraction)
+    ("ask_reach", "<f4"),
+    ("bid_depth", "<f4", (BINS,)),  # Quote notional per bin, nearest bin first
+    ("ask_depth", "<f4", (BINS,))
+])
+
+# Keys of a /depth body; its values are found between consecutive keys
+_DEPTH_KEYS = (b'"lastUpdateId"', b'"bids"', b'"asks"')
+_PUNCTUATION = b'{}[]":'
+
+_POOL = ThreadPoolExecutor(max_workers=COLLECT_WORKERS, thread_name_prefix="depth")
+
+def _levels(text):
+    levels = parse_rows(text, 2, "/depth")
+    return levels[:, 0], levels[:, 1]
+
+# Decode a raw /depth body into (update_id, bid prices, bid qtys, ask prices, ask qtys)
+def decode_depth(raw):
+    starts = sorted((raw.index(key), key) for key in _DEPTH_KEYS)
+    values = {}
+    for (at, key), (end, _) in zip(starts, starts[1:] + [(len(raw), None)]):
+        values[key] = raw[at + len(key):end].translate(None, _PUNCTUATION).strip(b", \n")
+    return (int(values[b'"lastUpdateId"']), *_levels(values[b'"bids"']), *_levels(values[b'"asks"']))
+
+# Notional per bin and the reach of one side; if the side was cut off at the
+# request limit, bins extending past its deepest level are NaN (unknown)
+def _bin(prices, quantities, mid, sign, truncated):
+    distance = sign * (mid - prices) / mid
+    index = np.floor(distance / BIN_WIDTH).astype(np.int64)
+    inside = (index >= 0) & (index < BINS)
+    reach = float(distance.max()) if len(distance) else 0.0
+    depth = np.bincount(index[inside], weights=(prices * quantities)[inside], minlength=BINS)
+    if truncated:
+        depth[np.arange(1, BINS + 1) * BIN_WIDTH > reach] = np.nan
+    return depth, reach
+
+# Reduce one decoded book to a SNAPSHOT_DTYPE record
+# A side with `limit` levels may go deeper than returned (see _bin); pass
+# limit=None for a book known to be complete.
+def snapshot_record(collected_at, update_id, bid_prices, bid_qty, ask_prices, ask_qty, limit=DEPTH_LIMIT):
+    record = np.zeros(1, dtype=SNAPSHOT_DTYPE)
+    record["time"], record["update_id"] = collected_at, update_id
+    if not len(bid_prices) or not len(ask_prices):
+        record["bid"], record["ask"] = np.nan, np.nan
+        return record
+    bid, ask = bid_prices[0], ask_prices[0]
+    mid = (bid + ask) / 2
+    record["bid"], record["ask"] = bid, ask
+    record["bid_depth"][0], record["bid_reach"] = _bin(bid_prices, bid_qty, mid, 1, limit is not None and len(bid_prices) >= limit)
+    record["ask_depth"][0], record["ask_reach"] = _bin(ask_prices, ask_qty, mid, -1, limit is not None and len(ask_prices) >= limit)
+    return record
+
+def _day_path(symbol, ts):
+    return os.path.join(store.STORE_DIR, symbol, "depth", datetime.fromtimestamp(ts / 1000, timezone.utc).strftime("%Y-%m-%d"))
+
+# Fetch one snapshot and append its record to the symbol's day file
+def snapshot(symbol, limit=DEPTH_LIMIT):
+    raw = client.get_raw("depth", {"symbol": symbol, "limit": limit})
+    record = snapshot_record(int(time.time() * 1000), *decode_depth(raw), limit=limit)
+    if store.enabled():
+        path = _day_path(symbol, int(record["time"][0]))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "ab") as f:  # One small O_APPEND write per record
+            f.write(record.tobytes())
+    return record
+
+# Snapshot several symbols concurrently: one record per symbol, in order
+def collect(symbols, limit=DEPTH_LIMIT):
+    futures = [_POOL.submit(snapshot, symbol, limit) for symbol in symbols]
+    return np.concatenate([f.result() for f in futures])
+
+# Stored records for one symbol with time in [start_ts, end_ts]
+def load(symbol, start_ts, end_ts):
+    parts = []
+    for day in range(start_ts // DAY_MS * DAY_MS, end_ts + 1, DAY_MS):
+        path = _day_path(symbol, day)
+        if os.path.exists(path):
+            records = np.fromfile(path, dtype=SNAPSHOT_DTYPE, count=os.path.getsize(path) // SNAPSHOT_DTYPE.itemsize)
+            parts.append(records[(records["time"] >= start_ts) & (records["time"] <= end_ts)])
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=SNAPSHOT_DTYPE)
+
+# Liquidity metrics for an array of records (any mix of symbols and times)
+# Depth figures are quote notional within +/-1% and +/-2% of mid, NaN where
+# the snapshot's levels stopped short of the band (see *_reach). Imbalance
+# is (bid - ask) / (bid + ask) depth within 1%.
+def depth_metrics(records):
+    mid = (records["bid"] + records["ask"]) / 2
+    within = {pct: round(pct / 100 / BIN_WIDTH) for pct in (1, 2)}
+    bid_1, ask_1 = (records[side][:, :within[1]].sum(axis=1, dtype=np.float64) for side in ("bid_depth", "ask_depth"))
+    bid_2, ask_2 = (records[side][:, :within[2]].sum(axis=1, dtype=np.float64) for side in ("bid_depth", "ask_depth"))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "time": records["time"],
+            "mid": mid,
+            "spread": records["ask"] - records["bid"],
+            "spread_bps": (records["ask"] - records["bid"]) / mid * 1e4,
+            "bid_depth_1pct": bid_1,
+            "ask_depth_1pct": ask_1,
+            "bid_depth_2pct": bid_2,
+            "ask_depth_2pct": ask_2,
+            "imbalance_1pct": (bid_1 - ask_1) / (bid_1 + ask_1),
+            "reach": np.minimum(records["bid_reach"], records["ask_reach"])
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect order-book depth snapshots into the local store")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--every", type=float, default=60.0, help="Seconds between snapshots")
+    parser.add_argument("--count", type=int, default=0, help="Stop after this many rounds (0 = run forever)")
+    parser.add_argument("--limit", type=int, default=DEPTH_LIMIT, help="Levels per side")
+    args = parser.parse_args()
+    rounds = 0
+    while not args.count or rounds < args.count:
+        started = time.time()
+        metrics = depth_metrics(collect(args.symbols, args.limit))
+        for i, symbol in enumerate(args.symbols):
+            print(f"{symbol}: spread {metrics['spread_bps'][i]:.2f} bps, depth 1% {metrics['bid_depth_1pct'][i]:.0f}/{metrics['ask_depth_1pct'][i]:.0f}, imbalance {metrics['imbalance_1pct'][i]:+.2f}")
+        rounds += 1
+        time.sleep(max(0.0, args.every - (time.time() - started)))
+
+if __name__ == "__main__":
+    main()
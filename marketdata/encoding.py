@@ -0,0 +1,105 @@
+import numpy as np
+
+# Compact column encodings for the kline store
+# Integer columns (open/close times, trade counts) are stored as first- or
+# second-order differences, zigzag-mapped and packed at the narrowest byte
+# width that fits the block: evenly spaced timestamps become all-zero
+# delta-of-deltas and cost nothing beyond their two seed values.
+# Float columns use a byte-aligned variant of Gorilla XOR compression: each
+# value is XORed with its predecessor and only the bytes between the leading
+# and trailing zero bytes are kept, behind a one-byte (offset, length) header.
+# Everything is vectorized; no per-value Python work on either side.
+BLOCK_ROWS = 4096  # Rows per independently decodable block
+
+_INTS, _FLOATS = 0, 1
+_WIDTHS = (0, 1, 2, 4, 8)
+_BYTE_POSITIONS = np.arange(8, dtype=np.uint8)
+
+def _zigzag(values):
+    return ((values << 1) ^ (values >> 63)).view(np.uint64)
+
+def _unzigzag(values):
+    return (values >> np.uint64(1)).view(np.int64) ^ -(values & np.uint64(1)).view(np.int64)
+
+def _width(residuals):
+    top = int(residuals.max()) if len(residuals) else 0
+    return next(w for w in _WIDTHS if w == 8 or top < 1 << (8 * w))
+
+# Encode an int64 array as seeds + packed order-1 or order-2 residuals,
+# whichever packs narrower
+def encode_ints(values):
+    values = np.ascontiguousarray(values, dtype=np.int64)
+    best = None
+    for order in (1, 2):
+        seeds, residuals = [], values
+        for _ in range(min(order, len(values))):
+            seeds.append(residuals[0])
+            residuals = np.diff(residuals)
+        residuals = _zigzag(residuals)
+        width = _width(residuals)
+        if best is None or width < best[2]:
+            best = (order, seeds, width, residuals)
+    order, seeds, width, residuals = best
+    header = np.array([len(values), len(seeds), width], dtype="<u4").tobytes()
+    packed = residuals.astype(f"<u{width}").tobytes() if width else b""
+    return header + np.array(seeds, dtype="<i8").tobytes() + packed
+
+def decode_ints(buf):
+    n, n_seeds, width = (int(v) for v in np.frombuffer(buf, dtype="<u4", count=3))
+    seeds = np.frombuffer(buf, dtype="<i8", count=n_seeds, offset=12)
+    count = max(n - n_seeds, 0)
+    if width:
+        residuals = np.frombuffer(buf, dtype=f"<u{width}", count=count, offset=12 + 8 * n_seeds).astype(np.uint64)
+    else:
+        residuals = np.zeros(count, dtype=np.uint64)
+    values = _unzigzag(residuals)
+    for seed in seeds[::-1]:
+        values = np.cumsum(np.concatenate(([seed], values)))
+    return values.astype(np.int64, copy=False)
+
+# Encode a float64 array with byte-aligned XOR compression
+def encode_floats(values):
+    bits = np.ascontiguousarray(values, dtype=np.float64).view(np.uint64).astype("<u8")
+    xored = bits.copy()
+    xored[1:] ^= bits[:-1]
+    octets = xored.view(np.uint8).reshape(-1, 8)  # Little-endian: column 0 is the low byte
+    nonzero = octets != 0
+    used = nonzero.any(axis=1)
+    low = np.where(used, nonzero.argmax(axis=1), 0).astype(np.uint8)
+    high = np.where(used, 8 - nonzero[:, ::-1].argmax(axis=1), 0).astype(np.uint8)
+    headers = (low << 4) | (high - np.minimum(low, high))
+    keep = (_BYTE_POSITIONS >= low[:, None]) & (_BYTE_POSITIONS < high[:, None])
+    return np.array([len(bits)], dtype="<u4").tobytes() + headers.tobytes() + octets[keep].tobytes()
+
+def decode_floats(buf):
+    n = int(np.frombuffer(buf, dtype="<u4", count=1)[0])
+    headers = np.frombuffer(buf, dtype=np.uint8, count=n, offset=4)
+    low = headers >> 4
+    high = low + (headers & 0x0F)
+    keep = (_BYTE_POSITIONS >= low[:, None]) & (_BYTE_POSITIONS < high[:, None])
+    octets = np.zeros((n, 8), dtype=np.uint8)
+    octets[keep] = np.frombuffer(buf, dtype=np.uint8, offset=4 + n)
+    xored = octets.reshape(-1).view("<u8")
+    return np.bitwise_xor.accumulate(xored).astype(np.uint64).view(np.float64)
+
+# Encode one block: a list of equally long int64/float64 columns
+# Layout: column count, byte offsets of each column, then the column payloads
+# (each prefixed with its kind), so single columns can be decoded on their own.
+def encode_block(columns):
+    payloads = [
+        bytes([_INTS]) + encode_ints(col) if np.issubdtype(col.dtype, np.integer) else bytes([_FLOATS]) + encode_floats(col)
+        for col in columns
+    ]
+    offsets = np.cumsum([0] + [len(p) for p in payloads]) + 4 * (len(payloads) + 2)
+    return np.array([len(payloads)], dtype="<u4").tobytes() + offsets.astype("<u4").tobytes() + b"".join(payloads)
+
+# Decode a block (bytes or a uint8 array); `which` selects column positions
+def decode_block(buf, which=None):
+    buf = memoryview(buf).cast("B")
+    count = int(np.frombuffer(buf, dtype="<u4", count=1)[0])
+    offsets = np.frombuffer(buf, dtype="<u4", count=count + 1, offset=4)
+    columns = []
+    for i in range(count) if which is None else which:
+        payload = buf[offsets[i]:offsets[i + 1]]
+        columns.append(decode_ints(payload[1:]) if payload[0] == _INTS else decode_floats(payload[1:]))
+    return columns
@@ -0,0 +1,106 @@
+import os
+import time
+import threading
+from collections import deque
+
+# Binance endpoint pool setup
+# Override with a comma-separated list in BINANCE_API_HOSTS, or a single base
+# URL in BINANCE_API_URL (e.g. the local stand-in in marketdata.mockserver).
+DEFAULT_HOSTS = [
+    "https://api.binance.com/api/v3",
+    "https://api1.binance.com/api/v3",
+    "https://api2.binance.com/api/v3",
+    "https://api3.binance.com/api/v3",
+    "https://data-api.binance.vision/api/v3"
+]
+SAMPLE_SIZE = 200  # Latency samples kept per host
+MIN_SAMPLES = 20  # Samples needed before a host's percentiles are trusted
+HEDGE_DELAY_DEFAULT = 0.5  # Seconds to wait before hedging while stats warm up
+HEDGE_DELAY_MIN = 0.05
+HEDGE_DELAY_MAX = 2.0
+SLOW_FACTOR = 3.0  # Eject a host whose median is this many times the best host's
+MAX_FAILURES = 3  # Eject a host after this many consecutive failures
+EJECT_SECONDS = 30.0
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+# Latency and health record for one base URL
+class HostStats:
+    def __init__(self, url):
+        self.url = url
+        self.latencies = deque(maxlen=SAMPLE_SIZE)
+        self.failures = 0
+        self.ejected_until = 0.0
+
+    # Ranking key for host selection: median of whatever samples exist so far
+    def rank(self):
+        return _percentile(self.latencies, 0.5) if self.latencies else None
+
+    def median(self):
+        return _percentile(self.latencies, 0.5) if len(self.latencies) >= MIN_SAMPLES else None
+
+    def p95(self):
+        return _percentile(self.latencies, 0.95) if len(self.latencies) >= MIN_SAMPLES else None
+
+# Pool of interchangeable base URLs with per-host latency tracking
+class HostPool:
+    def __init__(self, urls):
+        self.hosts = [HostStats(url.rstrip("/")) for url in urls]
+        self._lock = threading.Lock()
+
+    def urls(self):
+        return [h.url for h in self.hosts]
+
+    def _healthy(self, now):
+        healthy = [h for h in self.hosts if h.ejected_until <= now]
+        return healthy or list(self.hosts)
+
+    # Fastest healthy host not in `exclude` (hosts without stats rank first so they get sampled)
+    def pick(self, exclude=()):
+        with self._lock:
+            candidates = [h for h in self._healthy(time.time()) if h.url not in exclude]
+            if not candidates:
+                return None
+            best = min(candidates, key=lambda h: (h.rank() is not None, h.rank() or 0.0))
+            return best.url
+
+    # Delay after which a duplicate request is sent: the host's p95 latency
+    def hedge_delay(self, url):
+        with self._lock:
+            host = next(h for h in self.hosts if h.url == url)
+            p95 = host.p95()
+        delay = HEDGE_DELAY_DEFAULT if p95 is None else p95
+        return min(HEDGE_DELAY_MAX, max(HEDGE_DELAY_MIN, delay))
+
+    def record(self, url, latency, ok):
+        with self._lock:
+            host = next(h for h in self.hosts if h.url == url)
+            now = time.time()
+            if ok:
+                host.latencies.append(latency)
+                host.failures = 0
+            else:
+                host.failures += 1
+            medians = [h.median() for h in self.hosts if h.median() is not None]
+            slow = host.median() is not None and len(medians) > 1 and host.median() > SLOW_FACTOR * min(medians)
+            if host.failures >= MAX_FAILURES or slow:
+                host.ejected_until = now + EJECT_SECONDS
+                host.failures = 0
+                if slow:
+                    host.latencies.clear()  # Re-measure from scratch once it is back
+
+def _configured_hosts():
+    if os.environ.get("BINANCE_API_URL"):
+        return [os.environ["BINANCE_API_URL"]]
+    env = os.environ.get("BINANCE_API_HOSTS")
+    return [u.strip() for u in env.split(",") if u.strip()] if env else DEFAULT_HOSTS
+
+POOL = HostPool(_configured_hosts())
+
+# Replace the shared pool (e.g. to point every fetch at a local stand-in)
+def configure(urls):
+    global POOL
+    POOL = HostPool(urls)
+    return POOL
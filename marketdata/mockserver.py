@@ -0,0 +1,344 @@
+import os
+import json
+import time
+import zlib
+import random
+import argparse
+import threading
+import numpy as np
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from marketdata import client
+from marketdata.client import INTERVAL_MS
+from marketdata.ratelimit import request_weight
+from marketdata.resample import bucket_start, bucket_end
+
+# Local stand-in for the Binance REST API
+# Serves /api/v3/klines, /api/v3/aggTrades, /api/v3/depth and /api/v3/exchangeInfo (plus
+# ping/time) from recorded fixtures or deterministic synthetic data, with
+# optional latency, error and rate-limit injection. Point the fetchers at it with
+#   BINANCE_API_URL=http://127.0.0.1:8080/api/v3
+DEFAULT_SYMBOLS = ["BTCUSDT", "ETHUSDT", "AAVEUSDT", "SOLUSDT", "BNBUSDT", "UNIUSDT", "LINKUSDT"]
+LISTING_TS = 1483228800000  # 2017-01-01: first synthetic bar
+MAX_LIMIT = 1000
+TRADE_SPACING = 1000  # One synthetic aggregate trade per this many ms
+DEPTH_MAX_LIMIT = 5000
+
+# Counter-based uniform noise in [0, 1): the same key always gives the same value
+def _uniform(keys):
+    z = keys.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+# Synthetic price at each timestamp (ms); depends only on symbol, seed and time
+def _price(symbol, seed, ts):
+    h = zlib.crc32(symbol.encode()) ^ seed
+    base = 10 ** (1 + (h % 300) / 100)
+    phase = [(h >> s) % 628 / 100 for s in (3, 11, 19)]
+    days = ts / 86400000
+    log_price = (
+        np.log(base)
+        + 0.6 * np.sin(2 * np.pi * days / 365 + phase[0])
+        + 0.25 * np.sin(2 * np.pi * days / 47 + phase[1])
+        + 0.08 * np.sin(2 * np.pi * days / 9 + phase[2])
+        + 0.02 * (_uniform((ts // 1000).astype(np.uint64) * np.uint64(31) + np.uint64(h)) - 0.5)
+    )
+    return np.exp(log_price)
+
+# Synthetic klines with open times in `open_times` (ms, interval aligned;
+# "1M" bars span calendar months)
+def synthetic_klines(symbol, interval, open_times, seed=0):
+    t = np.asarray(open_times, dtype=np.int64)
+    step = bucket_end(t, interval) + 1 - t if interval == "1M" else INTERVAL_MS[interval]
+    opens = _price(symbol, seed, t)
+    closes = _price(symbol, seed, t + step)
+    key = (t // 1000).astype(np.uint64) * np.uint64(4) + np.uint64(zlib.crc32(symbol.encode()) ^ seed)
+    u = [_uniform(key + np.uint64(j)) for j in range(4)]
+    highs = np.maximum(opens, closes) * (1 + 0.01 * u[0])
+    lows = np.minimum(opens, closes) * (1 - 0.01 * u[1])
+    volumes = 1e6 / opens * (step / 86400000) * (0.5 + u[2])
+    mids = (opens + closes) / 2
+    taker_base = volumes * (0.3 + 0.4 * u[3])
+    trades = (volumes * mids / 500).astype(np.int64) + 1
+    close_times = t + step - 1
+    return [
+        [int(t[i]), f"{opens[i]:.8f}", f"{highs[i]:.8f}", f"{lows[i]:.8f}", f"{closes[i]:.8f}",
+         f"{volumes[i]:.8f}", int(close_times[i]), f"{volumes[i] * mids[i]:.8f}", int(trades[i]),
+         f"{taker_base[i]:.8f}", f"{taker_base[i] * mids[i]:.8f}", "0"]
+        for i in range(len(t))
+    ]
+
+# Open times of the calendar months a 1M /klines request returns: up to
+# `limit` months from startTime, or the last `limit` up to endTime
+def _month_starts(start_ts, end_ts, now, limit):
+    last = int(bucket_start([min(end_ts, now)], "1M")[0])
+    if start_ts is None:
+        first = LISTING_TS
+    else:
+        first = int(bucket_start([max(int(start_ts), LISTING_TS)], "1M")[0])
+        if first < int(start_ts):
+            first = int(bucket_end([first], "1M")[0]) + 1
+    months = np.arange(np.datetime64(first, "ms").astype("datetime64[M]"), np.datetime64(last, "ms").astype("datetime64[M]") + 1)
+    opens = months.astype("datetime64[ms]").view(np.int64)
+    return opens[:limit] if start_ts is not None else opens[-limit:]
+
+# Synthetic aggregate trades with the given ids (trade k falls in second k after listing)
+def synthetic_agg_trades(symbol, ids, seed=0):
+    ids = np.asarray(ids, dtype=np.int64)
+    key = ids.astype(np.uint64) * np.uint64(3) + np.uint64(zlib.crc32(symbol.encode()) ^ seed ^ 0x5EED)
+    u = [_uniform(key + np.uint64(j)) for j in range(3)]
+    times = LISTING_TS + ids * TRADE_SPACING + (u[0] * TRADE_SPACING).astype(np.int64)
+    prices = _price(symbol, seed, times)
+    quantities = 10 ** (u[1] * 4 - 1) / prices  # Notional spread log-uniformly over 0.1-1000 USDT
+    return [
+        {"a": int(ids[i]), "p": f"{prices[i]:.8f}", "q": f"{quantities[i]:.8f}", "f": int(ids[i]) * 2,
+         "l": int(ids[i]) * 2 + 1, "T": int(times[i]), "m": bool(u[2][i] < 0.5), "M": True}
+        for i in range(len(ids))
+    ]
+
+# Synthetic order book at `ts`: `limit` levels per side, about 3 bp of mid
+# apart, with resting notional growing away from the touch
+def synthetic_depth(symbol, ts, limit, seed=0):
+    mid = float(_price(symbol, seed, np.array([ts // 1000 * 1000]))[0])
+    tick = 10 ** np.floor(np.log10(mid * 1e-4))
+    step = np.ceil(mid * 3e-4 / tick) * tick
+    levels = np.arange(limit)
+    key = np.uint64(ts // 1000) * np.uint64(2 * DEPTH_MAX_LIMIT) + np.uint64(zlib.crc32(symbol.encode()) ^ seed ^ 0xB00C)
+    sides = {}
+    for j, (name, sign) in enumerate((("bids", -1), ("asks", 1))):
+        u = _uniform(key + np.uint64(j * DEPTH_MAX_LIMIT) + levels.astype(np.uint64))
+        prices = np.round(mid / tick) * tick + sign * (levels * step + tick)
+        quantities = (50 + 20 * levels) * (0.5 + u) / mid
+        sides[name] = [[f"{prices[i]:.8f}", f"{quantities[i]:.8f}"] for i in range(limit)]
+    return {"lastUpdateId": int(ts), **sides}
+
+# Load recorded fixtures: {(symbol, interval): rows sorted by open time}
+def load_fixtures(directory):
+    fixtures = {}
+    if not directory:
+        return fixtures
+    for name in os.listdir(directory):
+        if name.endswith(".json") and "_" in name:
+            symbol, interval = name[:-5].split("_", 1)
+            with open(os.path.join(directory, name)) as f:
+                fixtures[(symbol, interval)] = sorted(json.load(f), key=lambda row: row[0])
+    return fixtures
+
+# Record live klines into a fixture file the mock server can replay
+def record_fixture(symbol, interval, start_ts, end_ts, directory):
+    pages = client.download_pages(symbol, interval, start_ts, end_ts)
+    rows = [row for page in pages for row in json.loads(page)]
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{symbol}_{interval}.json")
+    with open(path, "w") as f:
+        json.dump(rows, f)
+    return path
+
+class MockBinanceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        endpoint = url.path.rsplit("/api/v3/", 1)[-1]
+        used = server.charge(request_weight(endpoint, params))
+        headers = {"X-MBX-USED-WEIGHT-1M": used}
+        time.sleep(server.delay())
+        if used > server.weight_limit:
+            return self._send(429, {"code": -1003, "msg": "Too many requests."}, {**headers, "Retry-After": 60 - int(time.time()) % 60})
+        if server.rng_uniform() < server.error_rate:
+            return self._send(500, {"code": -1000, "msg": "Injected error."}, headers)
+        if endpoint == "klines":
+            status, payload = server.klines(params)
+        elif endpoint == "aggTrades":
+            status, payload = server.agg_trades(params)
+        elif endpoint == "depth":
+            status, payload = server.depth(params)
+        elif endpoint == "exchangeInfo":
+            status, payload = 200, server.exchange_info()
+        elif endpoint == "ping":
+            status, payload = 200, {}
+        elif endpoint == "time":
+            status, payload = 200, {"serverTime": int(time.time() * 1000)}
+        else:
+            status, payload = 404, {"code": -1, "msg": f"Unknown endpoint {url.path}"}
+        self._send(status, payload, headers)
+
+class MockBinanceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, fixtures=None, symbols=None, latency=0.0, jitter=0.0,
+                 error_rate=0.0, stall_rate=0.0, stall=1.0, weight_limit=6000, seed=0, verbose=False):
+        super().__init__(address, MockBinanceHandler)
+        self.fixtures = load_fixtures(fixtures)
+        self.symbols = symbols or sorted({s for s, _ in self.fixtures} | set(DEFAULT_SYMBOLS))
+        self.latency, self.jitter = latency, jitter
+        self.error_rate, self.stall_rate, self.stall = error_rate, stall_rate, stall
+        self.weight_limit = weight_limit
+        self.seed = seed
+        self.verbose = verbose
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._minute, self._used = 0, 0
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/v3"
+
+    def rng_uniform(self):
+        with self._lock:
+            return self._rng.random()
+
+    # Simulated network/server time for one request
+    def delay(self):
+        with self._lock:
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            if self._rng.random() < self.stall_rate:
+                delay += self.stall
+        return delay
+
+    # Per-minute request weight accounting, as reported in X-MBX-USED-WEIGHT-1M
+    def charge(self, weight):
+        with self._lock:
+            minute = int(time.time() // 60)
+            if minute != self._minute:
+                self._minute, self._used = minute, 0
+            self._used += weight
+            return self._used
+
+    def klines(self, params):
+        symbol, interval = params.get("symbol"), params.get("interval")
+        limit = min(int(params.get("limit", 500)), MAX_LIMIT)
+        now = int(time.time() * 1000)
+        end_ts = int(params.get("endTime", now))
+        start_ts = params.get("startTime")
+        rows = self.fixtures.get((symbol, interval))
+        if rows is not None:
+            rows = [r for r in rows if r[0] <= end_ts and (start_ts is None or r[0] >= int(start_ts))]
+            return 200, (rows[:limit] if start_ts is not None else rows[-limit:])
+        if interval == "1M":
+            return 200, synthetic_klines(symbol, interval, _month_starts(start_ts, end_ts, now, limit), self.seed)
+        if interval not in INTERVAL_MS:
+            return 400, {"code": -1120, "msg": "Invalid interval."}
+        step = INTERVAL_MS[interval]
+        last = min(end_ts, now) // step * step
+        if start_ts is None:
+            first = max(last - (limit - 1) * step, LISTING_TS)
+        else:
+            first = max(-(-int(start_ts) // step) * step, -(-LISTING_TS // step) * step)
+            last = min(last, first + (limit - 1) * step)
+        if last < first:
+            return 200, []
+        return 200, synthetic_klines(symbol, interval, np.arange(first, last + 1, step), self.seed)
+
+    def agg_trades(self, params):
+        symbol = params.get("symbol")
+        limit = min(int(params.get("limit", 500)), MAX_LIMIT)
+        now = int(time.time() * 1000)
+        end_ts = min(int(params.get("endTime", now)), now)
+        if "fromId" in params:
+            first, start_ts = int(params["fromId"]), 0
+        else:
+            start_ts = int(params.get("startTime", now - 3600000))
+            first = max((start_ts - LISTING_TS) // TRADE_SPACING, 0)
+        trades = synthetic_agg_trades(symbol, np.arange(first, first + limit + 1), self.seed)
+        return 200, [t for t in trades if start_ts <= t["T"] <= end_ts][:limit]
+
+    def depth(self, params):
+        limit = min(int(params.get("limit", 100)), DEPTH_MAX_LIMIT)
+        return 200, synthetic_depth(params.get("symbol"), int(time.time() * 1000), limit, self.seed)
+
+    def exchange_info(self):
+        return {
+            "timezone": "UTC",
+            "serverTime": int(time.time() * 1000),
+            "rateLimits": [{"rateLimitType": "REQUEST_WEIGHT", "interval": "MINUTE", "intervalNum": 1, "limit": self.weight_limit}],
+            "symbols": [
+                {"symbol": s, "status": "TRADING", "baseAsset": s[:-4], "quoteAsset": "USDT"}
+                for s in self.symbols
+            ]
+        }
+
+# In-process stand-in for a ccxt exchange (fetch_ohlcv only)
+# Quotes the same synthetic market as the server, with this venue's price
+# basis and share of volume; `offset_ms` shifts its bar stamps and `missing`
+# drops that fraction of bars, to exercise cross-venue alignment.
+class StandInExchange:
+    def __init__(self, id, basis=0.0, volume_share=1.0, offset_ms=0, missing=0.0, latency=0.0, seed=0):
+        self.id = id
+        self.basis = basis
+        self.volume_share = volume_share
+        self.offset_ms = offset_ms
+        self.missing = missing
+        self.latency = latency
+        self.seed = seed
+        self.calls = 0
+
+    def fetch_ohlcv(self, symbol, timeframe="1m", since=None, limit=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        step = INTERVAL_MS[timeframe]
+        limit = min(limit or 500, MAX_LIMIT)
+        now = int(time.time() * 1000)
+        first = max(since if since is not None else now - limit * step, LISTING_TS) - self.offset_ms
+        first = -(-first // step) * step
+        opens = np.arange(first, min(first + limit * step, now), step)
+        keep = _uniform(opens // 1000 + np.int64(zlib.crc32(self.id.encode()))) >= self.missing
+        rows = synthetic_klines(symbol.replace("/", ""), timeframe, opens[keep], self.seed)
+        price = 1 + self.basis
+        return [
+            [row[0] + self.offset_ms, *(float(v) * price for v in row[1:5]), float(row[5]) * self.volume_share]
+            for row in rows
+        ]
+
+# Start a mock server on a background thread (port 0 picks a free port)
+def start(port=0, host="127.0.0.1", **options):
+    server = MockBinanceServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True, name="mock-binance").start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Binance API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--fixtures", help="Directory of recorded SYMBOL_INTERVAL.json klines")
+    parser.add_argument("--latency", type=float, default=0.0, help="Base response delay (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra uniform random delay (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="Fraction of requests delayed by --stall")
+    parser.add_argument("--stall", type=float, default=1.0, help="Straggler delay (s)")
+    parser.add_argument("--weight-limit", type=int, default=6000, help="Request weight per minute before 429")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    server = MockBinanceServer(
+        (args.host, args.port), fixtures=args.fixtures, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, stall_rate=args.stall_rate, stall=args.stall,
+        weight_limit=args.weight_limit, seed=args.seed, verbose=args.verbose
+    )
+    print(f"Mock Binance API listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import time
+import argparse
+import numpy as np
+from marketdata import client, store
+from marketdata.client import INTERVAL_MS
+from marketdata.decode import parse_klines
+from marketdata.resample import bucket_start, bucket_end, resample
+
+# Multi-resolution kline pyramid
+# Each level is stored as an ordinary series in the kline store and is built
+# from the level below it: 1m -> 15m -> 1h -> 1d -> 1w. Levels only hold
+# complete buckets, and an update resamples just the buckets that are
+# missing from a level's coverage index but fully covered by its parent, so
+# keeping the pyramid current costs a few new 1m bars per call.
+LEVELS = ["1m", "15m", "1h", "1d", "1w"]
+
+def _now():
+    return int(time.time() * 1000)
+
+# First bucket starting at or after `ts` / last bucket ending at or before `ts`
+def _ceil_bucket(ts, interval):
+    start = int(bucket_start([ts], interval)[0])
+    return start if start == ts else int(bucket_end([start], interval)[0]) + 1
+
+def _floor_bucket_end(ts, interval):
+    start = int(bucket_start([ts], interval)[0])
+    end = int(bucket_end([start], interval)[0])
+    return end if end == ts else start - 1
+
+# Resample the parent's covered, not yet built buckets of `level` in [lo, hi]
+def _build_level(symbol, parent, level, lo, hi):
+    with store.lock(symbol, level):
+        covered = store.coverage(symbol, level)
+        parent_covered = store.coverage(symbol, parent)
+        pieces = []
+        for gap_lo, gap_hi in covered.missing(lo, hi):
+            for held_lo, held_hi in parent_covered.held(gap_lo, gap_hi):
+                first, last = _ceil_bucket(held_lo, level), _floor_bucket_end(held_hi, level)
+                if first > last:
+                    continue
+                bars = store.read(symbol, parent, first, last)
+                pieces.append((first, last, parse_klines([]) if bars is None else resample(bars, level, partial=True)))
+                covered.add(first, last)
+        if pieces:
+            store.merge(symbol, level, pieces, covered)
+
+# Bring the pyramid up to date over [start_ts, end_ts], up to level `top`
+# The base level is fetched gap-only through the client over whole `top`
+# buckets, so every level can complete the buckets the range touches.
+def update(symbol, start_ts, end_ts=None, top=LEVELS[-1]):
+    levels = LEVELS[:LEVELS.index(top) + 1]
+    lo = int(bucket_start([start_ts], top)[0])
+    hi = min(int(bucket_end(bucket_start([end_ts or _now()], top), top)[0]), _now())
+    client.fetch_klines(symbol, levels[0], lo, hi)
+    for parent, level in zip(levels, levels[1:]):
+        _build_level(symbol, parent, level, lo, hi)
+
+# Query planner: the coarsest level whose bars tile `interval`, or None
+def plan(interval):
+    for level in reversed(LEVELS):
+        if interval == "1M":
+            if level != "1w":
+                return level
+        elif interval in INTERVAL_MS and INTERVAL_MS[interval] % INTERVAL_MS[level] == 0:
+            return level
+    return None
+
+# Fill `level` over [lo, hi]: buckets the finer stored levels cover are
+# resampled from them, and whatever is still missing is fetched at `level`
+# itself (gap-only, through the client). A long range on an empty store
+# thus costs a few coarse pages instead of a 1m download.
+def _fill(symbol, level, lo, hi):
+    levels = LEVELS[:LEVELS.index(level) + 1]
+    for parent, child in zip(levels, levels[1:]):
+        _build_level(symbol, parent, child, lo, hi)
+    client.fetch_klines(symbol, level, lo, hi)
+
+# Complete `interval` bars with open time in [start_ts, end_ts], read from
+# the coarsest pyramid level that can produce them (resampled if the level
+# is finer than `interval`). Levels are filled first if needed (see _fill).
+def fetch(symbol, interval, start_ts, end_ts=None):
+    level = plan(interval)
+    if level is None or start_ts is None or not store.enabled():
+        return client.fetch_klines(symbol, interval, start_ts, end_ts)
+    lo = int(bucket_start([start_ts], interval)[0])
+    hi = int(bucket_end(bucket_start([end_ts or _now()], interval), interval)[0])
+    complete = int(bucket_start([_now()], level)[0]) - 1
+    if not store.coverage(symbol, level).covers(lo, min(hi, complete)):
+        _fill(symbol, level, lo, min(hi, complete))
+    bars = store.read(symbol, level, lo, hi)
+    if bars is None:
+        return parse_klines([])
+    if level != interval:
+        bars = resample(bars, interval)
+    ts = bars["timestamp"].to_numpy().astype("datetime64[ms]").view(np.int64)
+    return bars[(ts >= start_ts) & (ts <= (end_ts or _now()))].reset_index(drop=True)
+
+# fetch() for several symbols concurrently: {symbol: DataFrame} in order
+def fetch_many(symbols, interval="1d", start_ts=None, end_ts=None, max_workers=client.SYMBOL_WORKERS):
+    return client.fetch_many(symbols, interval, start_ts, end_ts, max_workers, fetch=fetch)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the kline pyramid in the local store")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--days", type=int, default=30, help="History to cover, counted back from now")
+    args = parser.parse_args()
+    start_ts = _now() - args.days * INTERVAL_MS["1d"]
+    for symbol in args.symbols:
+        update(symbol, start_ts)
+        print(f"{symbol}: " + ", ".join(f"{level} {len(store.coverage(symbol, level))} range(s)" for level in LEVELS))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: limiter is shared across threads only
+    fcntl = None
+
+# Binance request-weight limiter setup
+# Binance limits request weight per IP per minute. A token bucket sized to
+# HEADROOM of that limit is kept in a small state file guarded by an flock,
+# so every thread and process on the host draws from the same budget.
+WEIGHT_LIMIT = int(os.environ.get("BINANCE_WEIGHT_LIMIT", 6000))  # Weight per minute per IP
+HEADROOM = 0.9  # Fraction of the limit we allow ourselves to use
+STATE_PATH = os.environ.get(
+    "BINANCE_WEIGHT_STATE",
+    os.path.join(tempfile.gettempdir(), "cryptobot_binance_weight.json")
+)
+
+# Request weight per endpoint (see Binance REST API docs)
+ENDPOINT_WEIGHTS = {"klines": 2, "aggTrades": 4, "exchangeInfo": 20, "ticker/price": 2}
+DEPTH_WEIGHTS = [(100, 5), (500, 25), (1000, 50), (5000, 250)]
+
+_thread_lock = threading.Lock()
+
+def capacity():
+    return WEIGHT_LIMIT * HEADROOM
+
+def refill_rate():
+    return WEIGHT_LIMIT / 60.0  # Tokens per second
+
+def request_weight(endpoint, params=None):
+    if endpoint == "depth":
+        limit = int((params or {}).get("limit", 100))
+        return next((w for top, w in DEPTH_WEIGHTS if limit <= top), DEPTH_WEIGHTS[-1][1])
+    return ENDPOINT_WEIGHTS.get(endpoint, 1)
+
+# Run fn(state) -> state under the thread lock and the cross-process file lock
+def _update(fn):
+    with _thread_lock:
+        fd = os.open(STATE_PATH, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.read(fd, 4096)
+            now = time.time()
+            try:
+                state = json.loads(raw)
+            except ValueError:  # Empty or torn state file: start from a full bucket
+                state = {"tokens": capacity(), "updated": now, "blocked_until": 0.0}
+            elapsed = max(0.0, now - state["updated"])
+            state["tokens"] = min(capacity(), state["tokens"] + elapsed * refill_rate())
+            state["updated"] = now
+            state, result = fn(state, now)
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, json.dumps(state).encode())
+            return result
+        finally:
+            os.close(fd)
+
+# Block until `weight` tokens are available, then take them
+def acquire(weight=1):
+    weight = min(weight, capacity())
+    while True:
+        def take(state, now):
+            if now < state["blocked_until"]:
+                return state, state["blocked_until"] - now
+            if state["tokens"] >= weight:
+                state["tokens"] -= weight
+                return state, 0.0
+            return state, (weight - state["tokens"]) / refill_rate()
+        wait = _update(take)
+        if wait <= 0:
+            return
+        time.sleep(min(wait, 5.0))
+
+# Take `weight` tokens only if available right now (used for optional hedge requests)
+def try_acquire(weight=1):
+    def take(state, now):
+        if now >= state["blocked_until"] and state["tokens"] >= weight:
+            state["tokens"] -= weight
+            return state, True
+        return state, False
+    return _update(take)
+
+# Sync the bucket with the weight Binance reports, and honour 429/418 bans
+def observe(response):
+    used = response.headers.get("X-MBX-USED-WEIGHT-1M") or response.headers.get("x-mbx-used-weight-1m")
+    retry_after = response.headers.get("Retry-After")
+    banned = response.status_code in (418, 429)
+    if used is None and not banned:
+        return
+    def sync(state, now):
+        if used is not None:
+            state["tokens"] = min(state["tokens"], capacity() - float(used))
+        if banned:
+            backoff = float(retry_after) if retry_after else 60.0
+            state["blocked_until"] = max(state["blocked_until"], now + backoff)
+            state["tokens"] = min(state["tokens"], 0.0)
+        return state, None
+    _update(sync)
@@ -0,0 +1,69 @@
+import numpy as np
+from marketdata import client
+from marketdata.client import INTERVAL_MS
+from marketdata.decode import frame_from_columns, parse_klines
+
+# Kline resampling
+# Derives coarser bars (1h, 4h, 1d, 1w, 1M, ...) from a finer base series
+# the way Binance builds them: open = first open, high = max, low = min,
+# close = last close, and volume, quote volume, trade count and taker buy
+# volumes summed. Buckets follow Binance's alignment: fixed-length intervals
+# from the Unix epoch, weeks from Monday 00:00 UTC and months by calendar.
+WEEK_OFFSET = 4 * INTERVAL_MS["1d"]  # 1970-01-01 was a Thursday
+SUM_COLUMNS = ["volume", "quote_volume", "trades", "taker_buy_base", "taker_buy_quote"]
+
+def _open_times(df):
+    return df["timestamp"].to_numpy().astype("datetime64[ms]").view(np.int64)
+
+# Open time of the bucket containing each open time (ms)
+def bucket_start(ts, interval):
+    ts = np.asarray(ts, dtype=np.int64)
+    if interval == "1M":
+        return ts.astype("datetime64[ms]").astype("datetime64[M]").astype("datetime64[ms]").view(np.int64)
+    step = INTERVAL_MS[interval]
+    offset = WEEK_OFFSET if interval == "1w" else 0
+    return (ts - offset) // step * step + offset
+
+# Close time (last ms) of the buckets opening at `starts`
+def bucket_end(starts, interval):
+    starts = np.asarray(starts, dtype=np.int64)
+    if interval == "1M":
+        return (starts.astype("datetime64[ms]").astype("datetime64[M]") + 1).astype("datetime64[ms]").view(np.int64) - 1
+    return starts + INTERVAL_MS[interval] - 1
+
+# Resample a time-ordered kline frame to `interval`
+# Buckets not fully spanned by the input (a leading bucket that starts
+# before the first bar, or a trailing one still running past the last bar's
+# close) are dropped unless partial=True.
+def resample(df, interval, partial=False):
+    if df.empty:
+        return parse_klines([])
+    ts = _open_times(df)
+    buckets = bucket_start(ts, interval)
+    first = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    last = np.concatenate((first[1:], [len(ts)])) - 1
+    starts = buckets[first]
+    ends = bucket_end(starts, interval)
+    columns = {
+        "timestamp": starts,
+        "open": df["open"].to_numpy()[first],
+        "high": np.maximum.reduceat(df["high"].to_numpy(), first),
+        "low": np.minimum.reduceat(df["low"].to_numpy(), first),
+        "close": df["close"].to_numpy()[last],
+        "close_time": ends
+    }
+    columns.update({name: np.add.reduceat(df[name].to_numpy(), first) for name in SUM_COLUMNS})
+    if not partial:
+        close_times = df["close_time"].to_numpy()
+        keep = (starts >= ts[0]) & (ends <= close_times[-1])
+        columns = {name: values[keep] for name, values in columns.items()}
+    return frame_from_columns(columns)
+
+# Fetch `interval` bars for [start_ts, end_ts] by resampling the `base`
+# series, so one stored fine-grained series serves every coarser interval
+def fetch_resampled(symbol, interval, start_ts, end_ts=None, base="1m"):
+    lo = int(bucket_start([start_ts], interval)[0])
+    hi = None if end_ts is None else int(bucket_end(bucket_start([end_ts], interval), interval)[0])
+    bars = resample(client.fetch_klines(symbol, base, lo, hi), interval)
+    ts = _open_times(bars)
+    return bars[(ts >= start_ts) & (end_ts is None or ts <= end_ts)].reset_index(drop=True)
@@ -0,0 +1,30 @@
+import threading
+from concurrent.futures import Future
+
+# In-process request coalescing
+# The first caller for a key runs the call; callers arriving while it is in
+# flight wait on the same Future and share its result (or exception).
+# Nothing is cached once the call completes.
+_inflight = {}
+_guard = threading.Lock()
+
+def do(key, fn, *args, **kwargs):
+    with _guard:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[key] = future
+    if not leader:
+        return future.result()
+    try:
+        result = fn(*args, **kwargs)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _guard:
+            _inflight.pop(key, None)
@@ -0,0 +1,264 @@
+import os
+import json
+import shutil
+import threading
+import contextlib
+import numpy as np
+from marketdata import encoding
+from marketdata.coverage import CoverageIndex
+from marketdata.decode import KLINE_COLUMNS, frame_from_columns
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are serialized within one process only
+    fcntl = None
+
+# Kline store setup
+# One directory per (symbol, interval). "timestamp" (open time, int64 ms,
+# ascending) doubles as the index. Bars are kept in two tiers inside the live
+# generation directory:
+#   blocks / index   sealed rows in BLOCK_ROWS-row compressed blocks
+#                    (marketdata.encoding) plus one (first open time, last
+#                    open time, byte offset, byte length) row per block
+#   tail-NNNNNN/     the most recent < BLOCK_ROWS rows as one fixed-width
+#                    column file per field
+# meta.json names the generation, the committed block/tail sizes and the
+# open-time ranges whose closed bars are all present (marketdata.coverage). Range reads decode only
+# the blocks they overlap and map the tail directly; every file is append-only
+# until a rewrite, so readers never see a partial commit and all processes
+# share the OS page cache.
+# Set KLINE_CACHE_DIR to an empty string to disable the store.
+STORE_DIR = os.environ.get("KLINE_CACHE_DIR", ".kline_cache")
+FORMAT = 3
+BLOCK_ROWS = encoding.BLOCK_ROWS
+INDEX_FIELDS = 4
+
+COLUMN_DTYPES = {name: np.int64 if name in ("timestamp", "close_time", "trades") else np.float64 for name in KLINE_COLUMNS}
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+def enabled():
+    return bool(STORE_DIR)
+
+def _series_dir(symbol, interval):
+    return os.path.join(STORE_DIR, symbol, interval)
+
+# Committed state of a series (None if absent or written by an older layout)
+def _meta(symbol, interval):
+    try:
+        with open(os.path.join(_series_dir(symbol, interval), "meta.json")) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return None
+    return meta if meta.get("format") == FORMAT else None
+
+def _commit(symbol, interval, meta):
+    path = os.path.join(_series_dir(symbol, interval), "meta.json")
+    with open(f"{path}.{os.getpid()}.tmp", "w") as f:
+        json.dump(dict(meta, format=FORMAT), f)
+    os.replace(f"{path}.{os.getpid()}.tmp", path)
+
+def _tail_dir(gen_dir, meta):
+    return os.path.join(gen_dir, f"tail-{meta['tail']:06d}")
+
+# Exclusive writer lock for one series (threads in this process and other processes)
+@contextlib.contextmanager
+def lock(symbol, interval):
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault((symbol, interval), threading.Lock())
+    with thread_lock:
+        os.makedirs(_series_dir(symbol, interval), exist_ok=True)
+        fd = os.open(os.path.join(_series_dir(symbol, interval), "lock"), os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+# CoverageIndex of the open-time ranges fully held for a series
+def coverage(symbol, interval):
+    meta = _meta(symbol, interval)
+    return CoverageIndex(meta["coverage"] if meta else ())
+
+def set_coverage(symbol, interval, covered):
+    meta = _meta(symbol, interval)
+    meta["coverage"] = covered.ranges()
+    _commit(symbol, interval, meta)
+
+def _map(path, dtype, shape):
+    if not np.prod(shape):  # Zero-length files cannot be mapped
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape).view(np.ndarray)
+
+# Read-only maps of the committed blocks, block index and tail columns
+def _open(symbol, interval):
+    while True:
+        meta = _meta(symbol, interval)
+        if not meta:
+            return None
+        gen_dir = os.path.join(_series_dir(symbol, interval), meta["generation"])
+        try:
+            blocks = _map(os.path.join(gen_dir, "blocks"), np.uint8, (meta["block_bytes"],))
+            index = _map(os.path.join(gen_dir, "index"), np.int64, (meta["blocks"], INDEX_FIELDS))
+            tail = {name: _map(os.path.join(_tail_dir(gen_dir, meta), name), dtype, (meta["rows"],)) for name, dtype in COLUMN_DTYPES.items()}
+            return blocks, index, tail
+        except FileNotFoundError:  # A rewrite or seal replaced these files; re-read meta.json
+            continue
+
+def _slice(columns, start_ts, end_ts):
+    index = columns["timestamp"]
+    lo = 0 if start_ts is None else int(np.searchsorted(index, start_ts, side="left"))
+    hi = len(index) if end_ts is None else int(np.searchsorted(index, end_ts, side="right"))
+    return {name: col[lo:hi] for name, col in columns.items()}
+
+# Bars with open time in [start_ts, end_ts]
+# Only the overlapping blocks are decoded; rows served purely from the tail
+# come back as views onto the maps.
+def read(symbol, interval, start_ts=None, end_ts=None):
+    state = _open(symbol, interval)
+    if state is None:
+        return None
+    blocks, index, tail = state
+    if not len(index) and not len(tail["timestamp"]):
+        return None
+    first = 0 if start_ts is None else int(np.searchsorted(index[:, 1], start_ts, side="left"))
+    last = len(index) if end_ts is None else int(np.searchsorted(index[:, 0], end_ts, side="right"))
+    parts = [
+        _slice(dict(zip(COLUMN_DTYPES, encoding.decode_block(blocks[offset:offset + length]))), start_ts, end_ts)
+        for _, _, offset, length in index[first:last]
+    ]
+    parts.append(_slice(tail, start_ts, end_ts))
+    parts = [part for part in parts if len(part["timestamp"])] or parts[-1:]
+    if len(parts) == 1:
+        return frame_from_columns(parts[0])
+    return frame_from_columns({name: np.concatenate([part[name] for part in parts]) for name in COLUMN_DTYPES})
+
+def last_timestamp(symbol, interval):
+    state = _open(symbol, interval)
+    if state is None:
+        return None
+    _, index, tail = state
+    if len(tail["timestamp"]):
+        return int(tail["timestamp"][-1])
+    return int(index[-1, 1]) if len(index) else None
+
+def _frame_columns(df):
+    columns = {}
+    for name, dtype in COLUMN_DTYPES.items():
+        values = df[name].to_numpy()
+        if name == "timestamp":
+            values = values.astype("datetime64[ms]", copy=False).view(np.int64)
+        columns[name] = np.ascontiguousarray(values.astype(dtype, copy=False))
+    return columns
+
+def _write_tail(tail_dir, columns, mode):
+    os.makedirs(tail_dir, exist_ok=True)
+    for name in COLUMN_DTYPES:
+        with open(os.path.join(tail_dir, name), mode) as f:
+            f.write(columns[name].tobytes())
+
+# Compress every whole block at the front of `columns` onto the generation's
+# blocks/index files and return the leftover rows
+def _seal(gen_dir, meta, columns):
+    rows = len(columns["timestamp"]) // BLOCK_ROWS * BLOCK_ROWS
+    if not rows:
+        return columns
+    with open(os.path.join(gen_dir, "blocks"), "ab") as blocks, open(os.path.join(gen_dir, "index"), "ab") as index:
+        for start in range(0, rows, BLOCK_ROWS):
+            block = {name: col[start:start + BLOCK_ROWS] for name, col in columns.items()}
+            data = encoding.encode_block(list(block.values()))
+            blocks.write(data)
+            index.write(np.array([block["timestamp"][0], block["timestamp"][-1], meta["block_bytes"], len(data)], dtype=np.int64).tobytes())
+            meta["blocks"] += 1
+            meta["block_bytes"] += len(data)
+    return {name: col[rows:] for name, col in columns.items()}
+
+# Append bars newer than the last stored one
+# Rows go to the tail; once it holds a whole block it is sealed and the
+# remainder moves to a fresh tail directory.
+def append(symbol, interval, df):
+    meta = _meta(symbol, interval)
+    if meta is None:
+        return write(symbol, interval, [df], CoverageIndex())
+    last = last_timestamp(symbol, interval)
+    if last is not None:
+        df = df[df["timestamp"].to_numpy().astype("datetime64[ms]").view(np.int64) > last]
+    if df.empty:
+        return
+    gen_dir = os.path.join(_series_dir(symbol, interval), meta["generation"])
+    # Drop any bytes left behind by an interrupted append or seal
+    for name, size in (("blocks", meta["block_bytes"]), ("index", meta["blocks"] * INDEX_FIELDS * 8)):
+        with open(os.path.join(gen_dir, name), "ab") as f:
+            f.truncate(size)
+    old_tail = _tail_dir(gen_dir, meta)
+    for name in COLUMN_DTYPES:
+        with open(os.path.join(old_tail, name), "ab") as f:
+            f.truncate(meta["rows"] * 8)
+    columns = _frame_columns(df)
+    if meta["rows"] + len(df) < BLOCK_ROWS:
+        _write_tail(old_tail, columns, "ab")
+        meta["rows"] += len(df)
+        return _commit(symbol, interval, meta)
+    _, _, tail = _open(symbol, interval)
+    columns = {name: np.concatenate([tail[name], columns[name]]) for name in COLUMN_DTYPES}
+    columns = _seal(gen_dir, meta, columns)
+    meta["tail"] += 1
+    meta["rows"] = len(columns["timestamp"])
+    _write_tail(_tail_dir(gen_dir, meta), columns, "wb")
+    _commit(symbol, interval, meta)
+    shutil.rmtree(old_tail, ignore_errors=True)
+
+# Rewrite a series from an iterable of time-ordered DataFrames into a new
+# generation, then switch meta.json over to it. Readers of the previous
+# generation keep their maps; its files are unlinked afterwards.
+# `covered` (a CoverageIndex) is saved once every frame has been written.
+def write(symbol, interval, frames, covered):
+    series_dir = _series_dir(symbol, interval)
+    old = _meta(symbol, interval)
+    generation = f"gen-{(int(old['generation'][4:]) + 1) if old else 0:06d}"
+    gen_dir = os.path.join(series_dir, generation)
+    shutil.rmtree(gen_dir, ignore_errors=True)
+    os.makedirs(gen_dir)
+    for name in ("blocks", "index"):
+        open(os.path.join(gen_dir, name), "wb").close()
+    meta = {"generation": generation, "blocks": 0, "block_bytes": 0, "tail": 0, "rows": 0}
+    pending = {name: np.empty(0, dtype=dtype) for name, dtype in COLUMN_DTYPES.items()}
+    for df in frames:
+        if len(df):
+            columns = _frame_columns(df)
+            pending = _seal(gen_dir, meta, {name: np.concatenate([pending[name], columns[name]]) for name in COLUMN_DTYPES})
+    meta["rows"] = len(pending["timestamp"])
+    _write_tail(_tail_dir(gen_dir, meta), pending, "wb")
+    meta["coverage"] = covered.ranges()
+    _commit(symbol, interval, meta)
+    if old:
+        shutil.rmtree(os.path.join(series_dir, old["generation"]), ignore_errors=True)
+
+# Store bars downloaded or derived for the ranges in `pieces`, a time-ordered
+# list of (lo, hi, frame); each frame replaces anything held inside its range.
+# Pieces all past the last stored bar are appended, otherwise the series is
+# rewritten with stored bars and pieces interleaved. `covered` is saved with them.
+def merge(symbol, interval, pieces, covered):
+    last = last_timestamp(symbol, interval)
+    if last is None or last < pieces[0][0]:
+        for _, _, df in pieces:
+            append(symbol, interval, df)
+        return set_coverage(symbol, interval, covered)
+    write(symbol, interval, interleave(symbol, interval, pieces), covered)
+
+# Frames for write(): each (lo, hi, frame) piece in turn, with the stored bars
+# between pieces read window by window from the current generation, so the
+# whole series is never held in memory. `pieces` may be any iterable.
+def interleave(symbol, interval, pieces):
+    cursor = None
+    for lo, hi, df in pieces:
+        stored = read(symbol, interval, cursor, lo - 1)
+        if stored is not None:
+            yield stored
+        yield df
+        cursor = hi + 1
+    stored = read(symbol, interval, cursor)
+    if stored is not None:
+        yield stored
@@ -0,0 +1,234 @@
+import os
+import re
+import time
+import struct
+import argparse
+import threading
+import numpy as np
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from marketdata import client, encoding, store
+from marketdata.archive import bounded_map, iter_chunks
+from marketdata.decode import parse_rows
+
+# Aggregate trade ingestion and statistics
+# Trades come from /api/v3/aggTrades or the public aggTrades archives and
+# are kept per UTC day under <store>/<symbol>/aggTrades/<YYYY-MM-DD>, as a
+# sequence of length-prefixed marketdata.encoding blocks. Statistics are
+# computed in one pass over those blocks, so memory stays bounded by a block
+# whatever the range.
+TRADE_COLUMNS = ["id", "price", "qty", "first_id", "last_id", "time", "buyer_maker"]
+AGG_TRADE_FIELDS = 8  # a, p, q, f, l, T, m, M
+TRADE_LIMIT = 1000  # Max trades Binance returns per /aggTrades request
+WINDOW_MS = 3600000  # /aggTrades rejects startTime/endTime spans over an hour
+DAY_MS = 86400000
+TRADE_WORKERS = 4  # Hour windows downloaded concurrently
+SIZE_EDGES = np.array([0, 10, 100, 1e3, 1e4, 1e5, 1e6, np.inf])  # Trade notional buckets (quote asset)
+ARCHIVE_NAME = re.compile(r"^(?P<symbol>[A-Z0-9]+)-aggTrades-(?P<date>\d{4}-\d{2}(?:-\d{2})?)\.(?:zip|csv)$")
+
+# JSON keys and punctuation removed so an /aggTrades body becomes a flat number list
+_JSON_CHARS = b'{}[]":apqflTmM'
+
+_POOL = ThreadPoolExecutor(max_workers=TRADE_WORKERS, thread_name_prefix="agg-trades")
+
+def _columns(text, source):
+    rows = parse_rows(text, AGG_TRADE_FIELDS, source).T
+    columns = {name: rows[i] if name in ("price", "qty") else rows[i].astype(np.int64) for i, name in enumerate(TRADE_COLUMNS)}
+    columns["time"][columns["time"] > 10 ** 14] //= 1000  # Microsecond archives
+    return columns
+
+# Decode a raw /aggTrades body into {column: array}
+def decode_agg_trades(raw):
+    return _columns(raw.replace(b"true", b"1").replace(b"false", b"0").translate(None, _JSON_CHARS).strip(), "/aggTrades")
+
+# Decode a block of aggTrades archive CSV lines
+def decode_csv_trades(chunk):
+    text = chunk.replace(b"True", b"1").replace(b"False", b"0").replace(b"true", b"1").replace(b"false", b"0")
+    return _columns(text.replace(b"\r", b"").strip().replace(b"\n", b","), "aggTrades archive")
+
+def _slice(columns, mask):
+    return {name: values[mask] for name, values in columns.items()}
+
+def _day_path(symbol, day):
+    return os.path.join(store.STORE_DIR, symbol, "aggTrades", datetime.fromtimestamp(day / 1000, timezone.utc).strftime("%Y-%m-%d"))
+
+# Day file writer: rows are buffered until a whole block is ready, and the
+# file only appears under its final name once closed (each writer has its own
+# temporary file, so concurrent writers of a day never share one)
+class DayWriter:
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self.file = open(self.tmp, "wb")
+        self.pending = []
+        self.rows = 0
+
+    def write(self, columns):
+        self.pending.append(columns)
+        self.rows += len(columns["id"])
+        if self.rows >= encoding.BLOCK_ROWS:
+            self._flush(final=False)
+
+    def _flush(self, final):
+        merged = {name: np.concatenate([p[name] for p in self.pending]) for name in TRADE_COLUMNS}
+        rows = self.rows if final else self.rows // encoding.BLOCK_ROWS * encoding.BLOCK_ROWS
+        for start in range(0, rows, encoding.BLOCK_ROWS):
+            block = encoding.encode_block([merged[name][start:start + encoding.BLOCK_ROWS] for name in TRADE_COLUMNS])
+            self.file.write(struct.pack("<I", len(block)) + block)
+        self.pending = [{name: values[rows:] for name, values in merged.items()}]
+        self.rows -= rows
+
+    def close(self):
+        self._flush(final=True)
+        self.file.close()
+        os.replace(self.tmp, self.path)
+
+# Stream the blocks of a stored day
+def _read_day(path):
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(4)
+            if not header:
+                break
+            block = f.read(struct.unpack("<I", header)[0])
+            yield dict(zip(TRADE_COLUMNS, encoding.decode_block(block)))
+
+# Trades in [lo, hi] (one window of at most an hour) via startTime, then fromId
+def _download_window(symbol, lo, hi):
+    params = {"symbol": symbol, "startTime": lo, "endTime": hi, "limit": TRADE_LIMIT}
+    pages = []
+    while True:
+        page = decode_agg_trades(client.get_raw("aggTrades", params))
+        pages.append(_slice(page, page["time"] <= hi))
+        if len(page["id"]) < TRADE_LIMIT or page["time"][-1] > hi:
+            break
+        params = {"symbol": symbol, "fromId": int(page["id"][-1]) + 1, "limit": TRADE_LIMIT}
+    return {name: np.concatenate([p[name] for p in pages]) for name in TRADE_COLUMNS}
+
+# Download [lo, hi] as hour windows, a few in flight, yielded in order
+def download_trades(symbol, lo, hi):
+    windows = [(start, min(start + WINDOW_MS - 1, hi)) for start in range(lo, hi + 1, WINDOW_MS)]
+    yield from bounded_map(_POOL, lambda window: _download_window(symbol, *window), windows, TRADE_WORKERS)
+
+# Download and store one whole past UTC day
+def ingest_day(symbol, day):
+    writer = DayWriter(_day_path(symbol, day))
+    for columns in download_trades(symbol, day, day + DAY_MS - 1):
+        writer.write(columns)
+    writer.close()
+
+# Stream trades with time in [start_ts, end_ts] block by block
+# Finished days are downloaded once and read from disk afterwards; the
+# current day is streamed straight from the API. A missing day is checked
+# and ingested under the symbol's trade lock, so concurrent readers wait for
+# one download instead of each fetching the day.
+def iter_trades(symbol, start_ts, end_ts):
+    now = int(time.time() * 1000)
+    for day in range(start_ts // DAY_MS * DAY_MS, end_ts + 1, DAY_MS):
+        path = _day_path(symbol, day)
+        if day + DAY_MS <= now and store.enabled():
+            with store.lock(symbol, "aggTrades"):
+                if not os.path.exists(path):
+                    ingest_day(symbol, day)
+            blocks = _read_day(path)
+        else:
+            blocks = download_trades(symbol, max(day, start_ts), min(day + DAY_MS - 1, end_ts, now))
+        for columns in blocks:
+            yield _slice(columns, (columns["time"] >= start_ts) & (columns["time"] <= end_ts))
+
+# Exact trade statistics over [start_ts, end_ts] in one streaming pass
+# VWAP and the taker buy/sell split come from every aggregate trade; "taker
+# buy" means the buyer was the aggressor (buyer_maker false). Trade sizes are
+# bucketed by quote notional on SIZE_EDGES.
+def trade_stats(symbol, start_ts, end_ts, edges=SIZE_EDGES):
+    edges = np.asarray(edges, dtype=np.float64)
+    totals = dict.fromkeys(["trades", "fills", "volume", "quote_volume", "taker_buy_volume", "taker_buy_quote"], 0.0)
+    size_counts = np.zeros(len(edges) - 1, dtype=np.int64)
+    size_quote = np.zeros(len(edges) - 1)
+    high, low, largest, first_price, last_price = -np.inf, np.inf, 0.0, None, None
+    for columns in iter_trades(symbol, start_ts, end_ts):
+        if not len(columns["id"]):
+            continue
+        price, qty = columns["price"], columns["qty"]
+        notional = price * qty
+        taker_buy = columns["buyer_maker"] == 0
+        totals["trades"] += len(price)
+        totals["fills"] += float((columns["last_id"] - columns["first_id"] + 1).sum())
+        totals["volume"] += qty.sum()
+        totals["quote_volume"] += notional.sum()
+        totals["taker_buy_volume"] += qty[taker_buy].sum()
+        totals["taker_buy_quote"] += notional[taker_buy].sum()
+        bucket = np.searchsorted(edges, notional, side="right") - 1
+        size_counts += np.bincount(bucket, minlength=len(edges))[:len(edges) - 1]
+        size_quote += np.bincount(bucket, weights=notional, minlength=len(edges))[:len(edges) - 1]
+        high, low, largest = max(high, price.max()), min(low, price.min()), max(largest, notional.max())
+        first_price = price[0] if first_price is None else first_price
+        last_price = price[-1]
+    volume, quote = totals["volume"], totals["quote_volume"]
+    return {
+        "trades": int(totals["trades"]),
+        "fills": int(totals["fills"]),
+        "volume": volume,
+        "quote_volume": quote,
+        "vwap": quote / volume if volume else np.nan,
+        "taker_buy_volume": totals["taker_buy_volume"],
+        "taker_sell_volume": volume - totals["taker_buy_volume"],
+        "taker_buy_quote": totals["taker_buy_quote"],
+        "taker_sell_quote": quote - totals["taker_buy_quote"],
+        "taker_buy_ratio": totals["taker_buy_volume"] / volume if volume else np.nan,
+        "open": first_price, "high": high, "low": low, "close": last_price,
+        "largest_trade_quote": largest,
+        "size_edges": edges,
+        "size_counts": size_counts,
+        "size_quote": size_quote
+    }
+
+# Import one aggTrades archive (daily or monthly) into day files
+def import_archive(path):
+    symbol = ARCHIVE_NAME.match(os.path.basename(path)).group("symbol")
+    with store.lock(symbol, "aggTrades"):
+        return _import_archive(symbol, path)
+
+def _import_archive(symbol, path):
+    writer, current, rows = None, None, 0
+    for i, chunk in enumerate(iter_chunks(path)):
+        if i == 0 and not chunk[:1].isdigit():
+            chunk = chunk[chunk.find(b"\n") + 1:]
+        columns = decode_csv_trades(chunk)
+        days = columns["time"] // DAY_MS * DAY_MS
+        for day in np.unique(days):
+            if day != current:
+                if writer is not None:
+                    writer.close()
+                writer, current = DayWriter(_day_path(symbol, int(day))), day
+            writer.write(_slice(columns, days == day))
+        rows += len(columns["id"])
+    if writer is not None:
+        writer.close()
+    return rows
+
+def _parse_date(text):
+    return int(datetime.strptime(text, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate trade statistics (VWAP, taker split, trade sizes)")
+    parser.add_argument("symbol")
+    parser.add_argument("--start", required=True, help="YYYY-MM-DD (UTC)")
+    parser.add_argument("--end", required=True, help="YYYY-MM-DD (UTC), inclusive")
+    parser.add_argument("--archives", help="Import SYMBOL-aggTrades-DATE.zip files from this directory first")
+    args = parser.parse_args()
+    if args.archives:
+        for name in sorted(os.listdir(args.archives)):
+            match = ARCHIVE_NAME.match(name)
+            if match and match.group("symbol") == args.symbol:
+                print(f"{name}: {import_archive(os.path.join(args.archives, name))} trades imported")
+    stats = trade_stats(args.symbol, _parse_date(args.start), _parse_date(args.end) + DAY_MS - 1)
+    for name, value in stats.items():
+        if not name.startswith("size_"):
+            print(f"{name}: {value}")
+    for lo, hi, count, quote in zip(stats["size_edges"][:-1], stats["size_edges"][1:], stats["size_counts"], stats["size_quote"]):
+        print(f"size {lo:g}-{hi:g}: {count} trades, {quote:.2f} quote")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import os
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from marketdata import pyramid
+from marketdata.client import INTERVAL_MS
+from marketdata.decode import frame_from_columns, parse_klines
+from marketdata.resample import bucket_start, bucket_end
+
+try:
+    import ccxt
+except ImportError:  # Only Binance (through marketdata.pyramid) and exchange objects are available
+    ccxt = None
+
+# Multi-venue composite klines
+# The same symbol is fetched from several venues at once and merged into one
+# bar per interval bucket: open/close are volume-weighted across the venues
+# trading in that bucket, high/low are the highest high and lowest low among
+# them, volume, quote volume and trades are summed.
+# Venues are "binance" (served by marketdata.pyramid from the local store),
+# ccxt exchange ids, or any object with ccxt's fetch_ohlcv(symbol, timeframe,
+# since, limit) such as mockserver.StandInExchange. Taker buy volumes only
+# come from venues that report them and are scaled up to the composite volume.
+VENUES = os.environ.get("MARKETDATA_VENUES", "binance").split(",")
+OHLCV_LIMIT = 500  # Bars asked for per fetch_ohlcv call
+VENUE_WORKERS = 8
+QUOTE_ASSETS = ["USDT", "USDC", "FDUSD", "TUSD", "BUSD", "DAI", "USD", "EUR", "TRY", "BTC", "ETH", "BNB"]
+
+_VENUE_FIELDS = ["timestamp", "open", "high", "low", "close", "volume", "quote_volume", "trades", "taker_buy_base", "taker_buy_quote"]
+
+_exchanges = {}
+
+# "BTCUSDT" -> "BTC/USDT" (ccxt's unified symbol)
+def unified_symbol(symbol):
+    if "/" in symbol:
+        return symbol
+    quote = next((q for q in QUOTE_ASSETS if symbol.endswith(q) and len(symbol) > len(q)), None)
+    if quote is None:
+        raise Exception(f"Unknown quote asset in {symbol}")
+    return f"{symbol[:-len(quote)]}/{quote}"
+
+def _exchange(venue):
+    if not isinstance(venue, str):
+        return venue
+    if venue not in _exchanges:
+        if ccxt is None:
+            raise Exception(f"ccxt is not installed; cannot use venue {venue}")
+        _exchanges[venue] = getattr(ccxt, venue)({"enableRateLimit": True})
+    return _exchanges[venue]
+
+def _venue_name(venue):
+    return venue if isinstance(venue, str) else getattr(venue, "id", type(venue).__name__)
+
+# One venue's bars in [start_ts, end_ts] as {field: array}, paging on `since`
+def _fetch_ohlcv(exchange, symbol, interval, start_ts, end_ts):
+    market, rows, since = unified_symbol(symbol), [], start_ts
+    while since <= end_ts:
+        page = exchange.fetch_ohlcv(market, interval, since=since, limit=OHLCV_LIMIT)
+        page = [row for row in page if since <= row[0] <= end_ts]
+        if not page:
+            break
+        rows.extend(page)
+        since = int(page[-1][0]) + 1
+    bars = np.array([row[:6] for row in rows], dtype=np.float64).reshape(-1, 6).T
+    columns = dict(zip(_VENUE_FIELDS[:6], bars))
+    columns["timestamp"] = columns["timestamp"].astype(np.int64)
+    columns["quote_volume"] = columns["volume"] * columns["close"]
+    columns["trades"] = np.zeros(len(rows), dtype=np.int64)
+    columns["taker_buy_base"] = columns["taker_buy_quote"] = np.full(len(rows), np.nan)
+    return columns
+
+def _fetch_venue(venue, symbol, interval, start_ts, end_ts):
+    if venue == "binance":
+        df = pyramid.fetch(symbol, interval, start_ts, end_ts)
+        columns = {name: df[name].to_numpy() for name in _VENUE_FIELDS[1:]}
+        columns["timestamp"] = df["timestamp"].to_numpy().astype("datetime64[ms]").view(np.int64)
+        return columns
+    return _fetch_ohlcv(_exchange(venue), symbol, interval, start_ts, end_ts)
+
+# Fetch [start_ts, end_ts] from every venue concurrently: {venue name: columns}
+def fetch_venues(symbol, interval="1d", start_ts=None, end_ts=None, venues=None, max_workers=VENUE_WORKERS):
+    venues = list(VENUES if venues is None else venues)
+    if start_ts is None:
+        raise Exception("start_ts is required for multi-venue fetches")
+    if end_ts is None:
+        end_ts = int(time.time() * 1000)
+    workers = max(1, min(max_workers, len(venues)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="venue") as pool:
+        futures = [pool.submit(_fetch_venue, v, symbol, interval, start_ts, end_ts) for v in venues]
+        results = {}
+        for venue, future in zip(venues, futures):
+            try:
+                results[_venue_name(venue)] = future.result()
+            except Exception as e:
+                raise Exception(f"Venue {_venue_name(venue)} failed for {symbol}: {e}")
+        return results
+
+# Merge per-venue columns into composite bars on `interval` buckets
+# A venue's bars are placed in the bucket containing their open time, so
+# venues stamping bars slightly differently still line up. Buckets where no
+# venue traded volume fall back to an equal-weighted open/close and take
+# high/low over every venue.
+def composite(per_venue, interval):
+    parts = [columns for columns in per_venue.values() if len(columns["timestamp"])]
+    if not parts:
+        return parse_klines([])
+    stacked = {name: np.concatenate([columns[name] for columns in parts]) for name in _VENUE_FIELDS}
+    starts, slot = np.unique(bucket_start(stacked["timestamp"], interval), return_inverse=True)
+    buckets = len(starts)
+
+    def total(values, where=None):
+        if where is None:
+            return np.bincount(slot, weights=values, minlength=buckets)
+        return np.bincount(slot[where], weights=values[where], minlength=buckets)
+
+    volume = total(stacked["volume"])
+    venues = np.bincount(slot, minlength=buckets)
+    traded = volume > 0
+    columns = {"timestamp": starts, "close_time": bucket_end(starts, interval), "volume": volume}
+    for name in ("open", "close"):
+        weighted = total(stacked[name] * stacked["volume"])
+        columns[name] = np.where(traded, weighted / np.where(traded, volume, 1), total(stacked[name]) / venues)
+    # A weighted high would sit below the traded high; NaN quotes are skipped
+    counted = (stacked["volume"] > 0) | ~traded[slot]
+    for name, reduce, empty in (("high", np.fmax, -np.inf), ("low", np.fmin, np.inf)):
+        extreme = np.full(buckets, empty)
+        reduce.at(extreme, slot[counted], stacked[name][counted])
+        columns[name] = np.where(np.isinf(extreme), np.nan, extreme)
+    columns["quote_volume"] = total(stacked["quote_volume"])
+    columns["trades"] = total(stacked["trades"]).astype(np.int64)
+    reported = ~np.isnan(stacked["taker_buy_base"])
+    reported_volume, reported_quote = total(stacked["volume"], reported), total(stacked["quote_volume"], reported)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        columns["taker_buy_base"] = total(stacked["taker_buy_base"], reported) * volume / reported_volume
+        columns["taker_buy_quote"] = total(stacked["taker_buy_quote"], reported) * columns["quote_volume"] / reported_quote
+    return frame_from_columns(columns)
+
+# Composite klines for `symbol` across `venues` (default VENUES)
+# With Binance as the only venue this is exactly pyramid.fetch.
+def fetch_composite(symbol, interval="1d", start_ts=None, end_ts=None, venues=None, max_workers=VENUE_WORKERS):
+    venues = list(VENUES if venues is None else venues)
+    if venues == ["binance"]:
+        return pyramid.fetch(symbol, interval, start_ts, end_ts)
+    if interval not in INTERVAL_MS and interval != "1M":
+        raise Exception(f"Unsupported interval {interval}")
+    return composite(fetch_venues(symbol, interval, start_ts, end_ts, venues, max_workers), interval)
@@ -0,0 +1,15 @@
+import pytest
+from marketdata import hosts, mockserver, ratelimit, store
+
+# A kline store and weight state under tmp_path, with every request sent to a
+# local mock server; all module globals are restored afterwards
+@pytest.fixture
+def mock_store(tmp_path, monkeypatch):
+    monkeypatch.setenv("KLINE_CACHE_DIR", str(tmp_path / "store"))
+    monkeypatch.setenv("BINANCE_WEIGHT_STATE", str(tmp_path / "weight"))
+    monkeypatch.setattr(store, "STORE_DIR", str(tmp_path / "store"))
+    monkeypatch.setattr(ratelimit, "STATE_PATH", str(tmp_path / "weight"))
+    server = mockserver.start()
+    monkeypatch.setattr(hosts, "POOL", hosts.HostPool([server.base_url]))
+    yield tmp_path
+    server.shutdown()
@@ -0,0 +1,38 @@
+import os
+from datetime import datetime, timezone
+from marketdata import archive, client, mockserver, store
+
+SYMBOL = "AAVEUSDT"
+DAY_MS = 86400000
+
+def _ms(*date):
+    return int(datetime(*date, tzinfo=timezone.utc).timestamp() * 1000)
+
+JAN, FEB, MAR, APR = _ms(2024, 1, 1), _ms(2024, 2, 1), _ms(2024, 3, 1), _ms(2024, 4, 1)
+
+# Write a monthly archive CSV for [start, end) as data.binance.vision lays it out
+def _write_month(directory, start, end, month):
+    rows = mockserver.synthetic_klines(SYMBOL, "1d", range(start, end, DAY_MS))
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{SYMBOL}-1d-{month}.csv"), "w") as f:
+        f.writelines(",".join(str(value) for value in row) + "\n" for row in rows)
+
+# Archive, API, archive: the fetched month between two imported ones survives
+def test_import_keeps_stored_bars_between_archive_files(mock_store):
+    client.fetch_klines(SYMBOL, "1d", FEB, MAR - 1)
+    _write_month(mock_store / "archives", JAN, FEB, "2024-01")
+    _write_month(mock_store / "archives", MAR, APR, "2024-03")
+    archive.import_archives(str(mock_store / "archives"), max_workers=2)
+
+    assert len(store.read(SYMBOL, "1d", FEB, MAR - 1)) == 29
+    assert len(store.read(SYMBOL, "1d", JAN, APR - 1)) == 31 + 29 + 31
+    assert store.coverage(SYMBOL, "1d").missing(JAN, APR - 1) == []
+
+# A month neither imported nor fetched stays a gap in the coverage index
+def test_import_leaves_missing_month_uncovered(mock_store):
+    _write_month(mock_store / "archives", JAN, FEB, "2024-01")
+    _write_month(mock_store / "archives", MAR, APR, "2024-03")
+    archive.import_archives(str(mock_store / "archives"), max_workers=2)
+
+    assert store.read(SYMBOL, "1d", FEB, MAR - 1).empty
+    assert store.coverage(SYMBOL, "1d").missing(JAN, APR - 1) == [(FEB, MAR - 1)]
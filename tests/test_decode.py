@@ -0,0 +1,33 @@
+import json
+import numpy as np
+import pytest
+from marketdata import depth, mockserver, trades
+from marketdata.decode import decode_csv_klines, parse_klines
+
+OPEN_TIMES = 1704067200000 + 86400000 * np.arange(3)
+
+def test_klines_round_trip():
+    rows = mockserver.synthetic_klines("AAVEUSDT", "1d", OPEN_TIMES)
+    df = parse_klines(json.dumps(rows).encode())
+    assert df["timestamp"].to_numpy().astype("datetime64[ms]").view(np.int64).tolist() == OPEN_TIMES.tolist()
+    assert df["close"].tolist() == [float(row[4]) for row in rows]
+
+@pytest.mark.parametrize("body, match", [
+    (b'{"code":-1121,"msg":"Invalid symbol."}', "unparsable"),
+    (b'[[1704067200000,"1.0","2.0"]]', "not rows of 12"),
+])
+def test_malformed_klines_name_the_endpoint(body, match):
+    with pytest.raises(ValueError, match=f"/klines payload.*{match}"):
+        parse_klines(body)
+
+def test_malformed_archive_lines_are_rejected():
+    line = b"1704067200000,1,2,0.5,1.5,10,1704153599999,15,3,5,7.5,0\n"
+    assert decode_csv_klines(line * 2)[1][0].tolist() == [1704067200000] * 2
+    with pytest.raises(ValueError, match="kline archive payload"):
+        decode_csv_klines(line + b"open_time,open,high\n" + line)
+
+def test_malformed_trades_and_depth_are_rejected():
+    with pytest.raises(ValueError, match="/aggTrades payload"):
+        trades.decode_agg_trades(b'[{"a":1,"p":"1.0","q":"oops"}]')
+    with pytest.raises(ValueError, match="/depth payload"):
+        depth.decode_depth(b'{"lastUpdateId":1,"bids":[["1.0","2.0"],["0.9"]],"asks":[]}')
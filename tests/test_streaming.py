@@ -0,0 +1,81 @@
+import json
+import numpy as np
+import pandas as pd
+from marketdata import mockserver
+from marketdata.decode import parse_klines
+from analysis import peer, technical
+from analysis.streaming import peer_streams, technical_streams
+from analysis.warmup import evaluate
+
+DAY = 86400000
+FIRST = 1672531200000  # 2023-01-01
+START_TS = FIRST + 150 * DAY  # 150 warm-up bars, then 250 requested ones
+
+TECHNICAL_FUNCTIONS = {
+    "sma_50": technical.calculate_sma_50,
+    "ema_20": technical.calculate_ema_20,
+    "rsi": technical.calculate_rsi,
+    "macd": technical.calculate_macd,
+    "bollinger_width": technical.calculate_bollinger_width,
+    "atr": technical.calculate_atr,
+    "obv": technical.calculate_obv,
+    "vwap": technical.calculate_vwap,
+    "roc": technical.calculate_roc,
+    "stochastic_k": technical.calculate_stochastic_k,
+    "williams_r": technical.calculate_williams_r,
+    "momentum": technical.calculate_momentum,
+    "volume_oscillator": technical.calculate_volume_oscillator,
+    "cmo": technical.calculate_cmo,
+    "channel_breakout": technical.calculate_channel_breakout
+}
+
+def _frame():
+    rows = mockserver.synthetic_klines("AAVEUSDT", "1d", FIRST + DAY * np.arange(400))
+    return parse_klines(json.dumps(rows).encode())
+
+# Every requested bar of the streamed set equals the batch series
+def test_technical_streams_follow_evaluate_bar_by_bar():
+    df = _frame()
+    streams = technical_streams()
+    first = pd.Timestamp(START_TS, unit="ms")
+    streamed = []
+    for bar in df[["timestamp", "high", "low", "close", "volume"]].to_dict("records"):
+        values = dict(streams.update(bar, warmup=bar["timestamp"] < first))
+        if bar["timestamp"] >= first:
+            streamed.append(values)
+    streamed = pd.DataFrame(streamed)
+    history = evaluate(TECHNICAL_FUNCTIONS, df, START_TS, series=True)
+
+    assert len(streamed) == 250
+    for name, values in history.items():
+        np.testing.assert_allclose(streamed[name].to_numpy(), values.to_numpy(dtype=np.float64), rtol=1e-9, atol=1e-9, err_msg=name)
+
+def test_technical_streams_match_the_fused_engine():
+    df = _frame()
+    streamed = technical_streams().replay(df, START_TS)
+    batch = technical.technical_indicators(df, START_TS)
+    for name, value in batch.items():
+        np.testing.assert_allclose(streamed[name], value, rtol=1e-9, atol=1e-9, err_msg=name)
+
+def test_peer_streams_match_peer_metrics():
+    df = _frame()
+    supply = peer.SUPPLIES["AAVEUSDT"]
+    streams = peer_streams(supply)
+    streamed = streams.replay(df, START_TS)
+    batch = peer.peer_metrics(df, supply, START_TS)
+
+    assert list(streamed) == list(batch)
+    for name, value in batch.items():
+        np.testing.assert_allclose(streamed[name], value, rtol=1e-9, atol=1e-9, err_msg=name)
+
+# A set restored from saved state continues exactly like the uninterrupted one
+def test_restored_state_continues_the_replay():
+    df = _frame()
+    whole = technical_streams().replay(df, START_TS)
+    first = technical_streams()
+    first.replay(df.iloc[:300], START_TS)
+    second = technical_streams()
+    second.load_state(first.state())
+    resumed = second.replay(df.iloc[300:])
+    for name, value in whole.items():
+        np.testing.assert_allclose(resumed[name], value, rtol=1e-12, atol=0, err_msg=name)
@@ -0,0 +1,25 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from marketdata import trades
+
+SYMBOL = "AAVEUSDT"
+DAY = 1704067200000  # 2024-01-01
+
+# Two readers of a missing day share one download and see the same trades
+def test_concurrent_readers_ingest_a_day_once(mock_store, monkeypatch):
+    ingested = []
+    ingest_day = trades.ingest_day
+
+    def counting(symbol, day):
+        ingested.append(day)
+        ingest_day(symbol, day)
+
+    monkeypatch.setattr(trades, "ingest_day", counting)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first, second = pool.map(lambda _: trades.trade_stats(SYMBOL, DAY, DAY + trades.DAY_MS - 1), range(2))
+
+    assert ingested == [DAY]
+    assert first["trades"] == second["trades"] == 86400
+    assert np.isclose(first["vwap"], second["vwap"])
+    assert sorted(os.listdir(os.path.dirname(trades._day_path(SYMBOL, DAY)))) == ["2024-01-01", "lock"]  # No temporary files left
@@ -0,0 +1,32 @@
+import numpy as np
+from marketdata import venues
+
+DAY = 86_400_000
+
+def _columns(timestamps, open_, high, low, close, volume):
+    n = len(timestamps)
+    return {
+        "timestamp": np.array(timestamps, dtype=np.int64),
+        "open": np.array(open_, dtype=np.float64),
+        "high": np.array(high, dtype=np.float64),
+        "low": np.array(low, dtype=np.float64),
+        "close": np.array(close, dtype=np.float64),
+        "volume": np.array(volume, dtype=np.float64),
+        "quote_volume": np.array(volume, dtype=np.float64) * np.array(close, dtype=np.float64),
+        "trades": np.zeros(n, dtype=np.int64),
+        "taker_buy_base": np.full(n, np.nan),
+        "taker_buy_quote": np.full(n, np.nan),
+    }
+
+def test_composite_takes_extremes_and_weights_open_close():
+    per_venue = {
+        "a": _columns([0, DAY], [10, 20], [12, 22], [9, 19], [11, 21], [3, 0]),
+        "b": _columns([60_000, DAY], [14, 30], [18, 31], [8, 29], [13, 30], [1, 0]),
+        "c": _columns([0], [50], [90], [1], [50], [0]),  # Quoted but did not trade
+    }
+    df = venues.composite(per_venue, "1d")
+    assert df["open"].tolist() == [(10 * 3 + 14) / 4, 25]
+    assert df["close"].tolist() == [(11 * 3 + 13) / 4, 25.5]
+    assert df["high"].tolist() == [18, 31]
+    assert df["low"].tolist() == [8, 19]
+    assert df["volume"].tolist() == [4, 0]